@@ -0,0 +1,87 @@
+"""
+Compare the speed of SqidsCodec against the reference sqids implementation,
+and the cost of the blocklist check.
+
+Usage: python -m benchmarks.codec
+"""
+import timeit
+
+from sqids import Sqids
+from sqids.constants import DEFAULT_BLOCKLIST
+
+from django_sqids.codec import DIGITS, SqidsCodec
+
+CONFIGS = [
+    {},
+    {"min_length": 10},
+    {"alphabet": "OPQRST1234567890", "min_length": 5},
+]
+NUMBERS = list(range(1, 20001, 7))
+BLOCKLIST_CONFIGS = [
+    {"min_length": 10},
+    {"min_length": 40},
+]
+
+
+def split_blocklist(alphabet, blocklist):
+    # the words of a blocklist as filtered by SqidsCodec and sqids.Sqids
+    alphabet = set(alphabet.lower())
+    words = {word.lower() for word in blocklist if len(word) > 3}
+    words = [word for word in words if set(word) <= alphabet]
+    match_at_ends = tuple(word for word in words if DIGITS & set(word))
+    match_anywhere = [word for word in words if not DIGITS & set(word)]
+    return match_at_ends, match_anywhere
+
+
+def is_blocked_by_words(codec, words, id_):
+    # the blocklist check before the words were compiled into regexes
+    match_at_ends, match_anywhere = words
+    id_ = id_.lower()
+    if len(id_) == 3:
+        return id_ in codec._exact_match
+    if id_.startswith(match_at_ends) or id_.endswith(match_at_ends):
+        return True
+    for word in match_anywhere:
+        if word in id_:
+            return True
+    return False
+
+
+def main():
+    for config in CONFIGS:
+        reference = Sqids(**config)
+        codec = SqidsCodec(**config)
+        sqids = [reference.encode([number]) for number in NUMBERS]
+        results = {
+            "reference encode": lambda: [reference.encode([n]) for n in NUMBERS],
+            "codec encode": lambda: [codec.encode(n) for n in NUMBERS],
+            "reference decode": lambda: [reference.decode(s) for s in sqids],
+            "codec decode": lambda: [codec.decode(s) for s in sqids],
+        }
+        print(config or "defaults")
+        for name, func in results.items():
+            seconds = min(timeit.repeat(func, number=1, repeat=5))
+            per_call = seconds / len(NUMBERS) * 1e6
+            print(f"  {name:<18} {per_call:8.2f} us/call")
+    for config in BLOCKLIST_CONFIGS:
+        codec = SqidsCodec(**config)
+        words = split_blocklist(codec.alphabet, DEFAULT_BLOCKLIST)
+        unblocked = SqidsCodec(blocklist=[], **config)
+        sqids = [codec.encode(number) for number in NUMBERS]
+        results = {
+            "words check": lambda: [
+                is_blocked_by_words(codec, words, s) for s in sqids
+            ],
+            "regex check": lambda: [codec.is_blocked(s) for s in sqids],
+            "encode": lambda: [codec.encode(n) for n in NUMBERS],
+            "empty blocklist": lambda: [unblocked.encode(n) for n in NUMBERS],
+        }
+        print("blocklist", config)
+        for name, func in results.items():
+            seconds = min(timeit.repeat(func, number=1, repeat=5))
+            per_call = seconds / len(NUMBERS) * 1e6
+            print(f"  {name:<18} {per_call:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
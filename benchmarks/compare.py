@@ -0,0 +1,45 @@
+"""
+Compare two result files written by ``python -m benchmarks.run``.
+
+Usage: python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def key(result):
+    return (
+        result["name"],
+        result["model"],
+        tuple(sorted(result["params"].items())),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = {key(result): result for result in json.load(f)["results"]}
+    with open(args.after) as f:
+        after = json.load(f)["results"]
+
+    print(f"{'benchmark':<48} {'before':>12} {'after':>12} {'change':>8}")
+    for result in after:
+        old = before.get(key(result))
+        name, model, params = key(result)
+        label = " ".join([name, model, *(f"{k}={v}" for k, v in params)])
+        if old is None:
+            print(f"{label:<48} {'-':>12} {result['us_per_op']:>9.2f} us {'new':>8}")
+            continue
+        change = result["us_per_op"] / old["us_per_op"] - 1
+        print(
+            f"{label:<48} {old['us_per_op']:>9.2f} us {result['us_per_op']:>9.2f} us"
+            f" {change:>+7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
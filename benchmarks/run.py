@@ -0,0 +1,203 @@
+"""
+Benchmark suite for django-sqids.
+
+Runs against the models in ``tests/test_app`` on an in-memory SQLite database
+and writes the results as JSON, so they can be compared between commits with
+``python -m benchmarks.compare``.
+
+Usage: python -m benchmarks.run [--rows 10000 100000] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+import sqids  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+
+from django_sqids import SqidsQuerySet  # noqa: E402
+
+from tests.test_app.models import (  # noqa: E402
+    TestModel,
+    TestModelWithDifferentConfig,
+    TestModelWithPrefix,
+)
+
+MODELS = {
+    "default": TestModel,
+    "prefix": TestModelWithPrefix,
+    "custom_config": TestModelWithDifferentConfig,
+}
+LOOKUPS = 1000
+IN_LIST_SIZES = (100, 1000, 5000)
+
+
+def measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def result(name, model, seconds, operations, **params):
+    return {
+        "name": name,
+        "model": model,
+        "params": params,
+        "operations": operations,
+        "seconds": seconds,
+        "us_per_op": seconds / operations * 1e6,
+    }
+
+
+def populate(model, rows):
+    model.objects.all().delete()
+    model.objects.bulk_create((model() for _ in range(rows)), batch_size=10000)
+
+
+def bench_field(label, model, repeat):
+    field = model.sqid
+    instances = list(model.objects.all()[:LOOKUPS])
+    ids = [instance.pk for instance in instances]
+    sqids_ = [field.encode(pk) for pk in ids]
+
+    def cold_get():
+        for instance in instances:
+            instance.__dict__.pop(field.cache_attname, None)
+            instance.sqid
+
+    def warm_get():
+        for instance in instances:
+            instance.sqid
+
+    yield result("get_cold", label, measure(cold_get, repeat), len(instances))
+    yield result("get_memoized", label, measure(warm_get, repeat), len(instances))
+    yield result(
+        "encode",
+        label,
+        measure(lambda: [field.encode(pk) for pk in ids], repeat),
+        len(ids),
+    )
+    yield result(
+        "decode",
+        label,
+        measure(lambda: [field.decode(sqid) for sqid in sqids_], repeat),
+        len(sqids_),
+    )
+
+    def exact_lookups():
+        for sqid in sqids_[:100]:
+            model.objects.filter(sqid=sqid).first()
+
+    yield result("filter_exact", label, measure(exact_lookups, repeat), 100)
+
+    def invalid_lookups():
+        for sqid in sqids_[:100]:
+            list(model.objects.filter(sqid=sqid + "!"))
+
+    yield result("filter_exact_invalid", label, measure(invalid_lookups, repeat), 100)
+
+    for size in IN_LIST_SIZES:
+        values = [field.encode(pk) for pk in range(1, size + 1)]
+        yield result(
+            "filter_in",
+            label,
+            measure(lambda: list(model.objects.filter(sqid__in=values)), repeat),
+            1,
+            size=size,
+        )
+
+
+def bench_rows(label, model, rows, repeat):
+    qs = model.objects.all()
+    yield result(
+        "values_list",
+        label,
+        measure(lambda: list(qs.values_list("sqid", flat=True)), repeat),
+        rows,
+        rows=rows,
+    )
+    yield result(
+        "values_list_id",
+        label,
+        measure(lambda: list(qs.values_list("id", flat=True)), repeat),
+        rows,
+        rows=rows,
+    )
+    yield result(
+        "iter_sqids",
+        label,
+        measure(lambda: list(SqidsQuerySet(model).iter_sqids(chunk_size=5000)), repeat),
+        rows,
+        rows=rows,
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--models", nargs="+", choices=sorted(MODELS), default=sorted(MODELS)
+    )
+    parser.add_argument("--output", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    settings.DEBUG = False
+    call_command("migrate", run_syncdb=True, verbosity=0)
+
+    results = []
+    for label in args.models:
+        model = MODELS[label]
+        for index, rows in enumerate(sorted(args.rows)):
+            started = time.perf_counter()
+            populate(model, rows)
+            if index == 0:
+                results.extend(bench_field(label, model, args.repeat))
+            results.extend(bench_rows(label, model, rows, args.repeat))
+            print(
+                f"{label}: {rows} rows done in {time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+        model.objects.all().delete()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqids": getattr(sqids, "__version__", None),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
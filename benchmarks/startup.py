@@ -0,0 +1,123 @@
+"""
+Measure the startup cost of SqidsFields: defining models, cloning fields and
+detecting migration changes.
+
+Codecs are built lazily, on the first encode or decode. ``--eager`` builds
+them when a field is added to a model instead, like before, to compare both.
+The migration autodetector is measured as well, although SqidsFields are not
+part of migration states.
+
+Usage: python -m benchmarks.startup [--models 500] [--eager]
+"""
+import argparse
+import copy
+import os
+import timeit
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.apps.registry import Apps  # noqa: E402
+from django.db import models  # noqa: E402
+from django.db.migrations.autodetector import MigrationAutodetector  # noqa: E402
+from django.db.migrations.graph import MigrationGraph  # noqa: E402
+from django.db.migrations.state import ModelState, ProjectState  # noqa: E402
+
+from django_sqids import SqidsField, registry, shuffle_alphabet  # noqa: E402
+
+CONFIGS = {
+    "default": lambda index: {},
+    "per_model": lambda index: {"alphabet": shuffle_alphabet(index), "prefix": "m-"},
+}
+
+
+def build_eagerly(field):
+    field.codec
+    field.encode_cache
+    field.decode_cache
+
+
+def eager_contribute_to_class(contribute_to_class):
+    def wrapper(self, cls, name, *args, **kwargs):
+        contribute_to_class(self, cls, name, *args, **kwargs)
+        build_eagerly(self)
+
+    return wrapper
+
+
+def define_models(count, config):
+    """
+    Define ``count`` models, each inheriting a SqidsField from an abstract model.
+    """
+    apps = Apps()
+    for index in range(count):
+        meta = type("Meta", (), {"app_label": "bench", "apps": apps, "abstract": True})
+        base = type(
+            "Base%d" % index,
+            (models.Model,),
+            {"__module__": __name__, "Meta": meta, "sqid": SqidsField(**config(index))},
+        )
+        meta = type("Meta", (), {"app_label": "bench", "apps": apps})
+        type("Model%d" % index, (base,), {"__module__": __name__, "Meta": meta})
+    return apps
+
+
+def get_models(apps):
+    # the registry has no app configs, the models are only registered
+    return list(apps.all_models["bench"].values())
+
+
+def detect_changes(apps):
+    to_state = ProjectState()
+    for model in get_models(apps):
+        to_state.add_model(ModelState.from_model(model))
+    return MigrationAutodetector(ProjectState(), to_state).changes(MigrationGraph())
+
+
+def measure(func, repeat):
+    def cold():
+        # every process starts without shared codecs
+        registry.clear()
+        func()
+
+    return min(timeit.repeat(cold, number=1, repeat=repeat))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--eager", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.eager:
+        SqidsField.contribute_to_class = eager_contribute_to_class(
+            SqidsField.contribute_to_class
+        )
+
+    print("%s codecs, %d models" % ("eager" if args.eager else "lazy", args.models))
+    for name, config in CONFIGS.items():
+        apps = define_models(args.models, config)
+        fields = [model.sqid for model in get_models(apps)]
+
+        def clone_fields():
+            for field in fields:
+                copy.deepcopy(field)
+
+        results = {
+            "define models": measure(
+                lambda: define_models(args.models, config), args.repeat
+            ),
+            "deepcopy fields": measure(clone_fields, args.repeat),
+            "detect changes": measure(lambda: detect_changes(apps), args.repeat),
+        }
+        print(name)
+        for label, seconds in results.items():
+            print(f"  {label:<16} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,18 @@
-from .field import SqidsField, shuffle_alphabet
+from .field import (
+    SqidsField,
+    get_sqids_field,
+    get_sqids_field_by_label,
+    shuffle_alphabet,
+)
+from .managers import SqidsManager, SqidsQuerySet
+from .versions import SqidsVersion
 
-__all__ = ["SqidsField", "shuffle_alphabet"]
+__all__ = [
+    "SqidsField",
+    "SqidsManager",
+    "SqidsQuerySet",
+    "SqidsVersion",
+    "get_sqids_field",
+    "get_sqids_field_by_label",
+    "shuffle_alphabet",
+]
@@ -0,0 +1,31 @@
+from .field import get_sqids_field
+
+
+class SqidsSearchMixin:
+    """
+    A ``ModelAdmin`` mixin that finds objects by their sqids without text search.
+
+    If every word of the search term is a sqid of the model, the objects
+    are looked up by their real field with a single query and the
+    ``search_fields`` are not searched. Several sqids can be pasted at once,
+    separated by spaces or commas. Other search terms are searched as usual.
+    """
+
+    sqids_search_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        sqids = search_term.replace(",", " ").split()
+        if sqids:
+            field = get_sqids_field(self.model, self.sqids_search_field)
+            values = [field.decode(sqid) for sqid in sqids]
+            # without a prefix most short words decode, only sqids the field
+            # would encode are taken for sqids
+            if None not in values and all(
+                field.encode(value) == sqid for value, sqid in zip(values, sqids)
+            ):
+                if field.composite:
+                    lookup = {"%s__in" % field.name: sqids}
+                else:
+                    lookup = {"%s__in" % field.real_field_name: values}
+                return queryset.filter(**lookup), False
+        return super().get_search_results(request, queryset, search_term)
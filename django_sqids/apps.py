@@ -0,0 +1,19 @@
+from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class DjangoSqidsConfig(AppConfig):
+    name = "django_sqids"
+    verbose_name = "Django Sqids"
+
+    def ready(self):
+        from .expressions import register_functions
+
+        connection_created.connect(
+            register_functions, dispatch_uid="django_sqids_register_functions"
+        )
+        # connections opened before the app was ready
+        for connection in connections.all(initialized_only=True):
+            if connection.connection is not None:
+                register_functions(connection)
@@ -0,0 +1,262 @@
+import re
+import sys
+from collections import namedtuple
+
+from sqids.constants import DEFAULT_ALPHABET, DEFAULT_BLOCKLIST, DEFAULT_MIN_LENGTH
+
+DIGITS = frozenset("0123456789")
+MIN_LENGTH_LIMIT = 255
+
+# Everything needed to encode or decode a sqid starting at a given alphabet offset
+_Table = namedtuple(
+    "_Table", ["prefix", "separator", "digits", "digit_index", "padding", "next"]
+)
+
+
+def _shuffle(alphabet):
+    chars = list(alphabet)
+    i = 0
+    j = len(chars) - 1
+    while j > 0:
+        r = (i * j + ord(chars[i]) + ord(chars[j])) % len(chars)
+        chars[i], chars[r] = chars[r], chars[i]
+        i += 1
+        j -= 1
+    return "".join(chars)
+
+
+def _words_regex(words):
+    """
+    Compile a regular expression matching any of the words.
+
+    The words are merged into a trie first, so the regex engine tries every
+    character of a string against a handful of branches instead of against
+    every word.
+    """
+    if not words:
+        return None
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        # a word ending here is enough, longer words add nothing to a search
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in node.items()]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:%s)" % "|".join(sorted(branches))
+
+    return re.compile(build(trie))
+
+
+class SqidsCodec:
+    """
+    Encode and decode single integers exactly like ``sqids.Sqids``.
+
+    A field only ever stores one number per sqid, so the rotated and
+    shuffled alphabets for every offset are computed once up front and
+    encoding and decoding are reduced to table lookups and base conversion.
+
+    ``pattern`` is a regular expression matching the characters and the
+    range of lengths of every sqid this codec can produce.
+
+    :param str alphabet: The alphabet used to encode.
+    :param int min_length: The minimum length of generated sqids.
+    :param blocklist: Words that may not appear in sqids, defaults to the
+        blocklist of the sqids library. The words are compiled into regular
+        expressions once, instead of being compared one by one.
+
+    """
+
+    def __init__(
+        self, alphabet=DEFAULT_ALPHABET, min_length=DEFAULT_MIN_LENGTH, blocklist=None
+    ):
+        if any(ord(char) > 127 for char in alphabet):
+            raise ValueError("Alphabet cannot contain multibyte characters")
+        if len(alphabet) < 3:
+            raise ValueError("Alphabet length must be at least 3")
+        if len(set(alphabet)) != len(alphabet):
+            raise ValueError("Alphabet must contain unique characters")
+        if not isinstance(min_length, int) or isinstance(min_length, bool):
+            raise TypeError("Minimum length must be an int")
+        if min_length < 0 or min_length > MIN_LENGTH_LIMIT:
+            raise ValueError(
+                f"Minimum length has to be between 0 and {MIN_LENGTH_LIMIT}"
+            )
+        if blocklist is None:
+            blocklist = DEFAULT_BLOCKLIST
+
+        self.alphabet = alphabet
+        self.min_length = min_length
+        self._set_blocklist(blocklist)
+
+        shuffled = _shuffle(alphabet)
+        self._length = len(shuffled)
+        self._base = self._length - 1
+        self._ords = [ord(char) for char in shuffled]
+        self._offsets = {char: offset for offset, char in enumerate(shuffled)}
+        self._chars = frozenset(shuffled)
+        self._tables = [
+            self._build_table(shuffled[offset:] + shuffled[:offset])
+            for offset in range(self._length)
+        ]
+        max_digits = len(self._to_id(sys.maxsize, self._tables[0].digits))
+        max_length = max(min_length, 1 + max_digits)
+        self.pattern = "[%s]{%d,%d}" % (
+            re.escape(shuffled),
+            max(2, min_length),
+            max_length,
+        )
+
+    def _set_blocklist(self, blocklist):
+        alphabet_lower = set(self.alphabet.lower())
+        exact_match = set()
+        match_at_ends = set()
+        match_anywhere = set()
+        for word in blocklist:
+            if len(word) < 3:
+                continue
+            word_lower = word.lower()
+            word_lower_set = set(word_lower)
+            if word_lower_set & alphabet_lower != word_lower_set:
+                continue
+            if len(word) == 3:
+                exact_match.add(word_lower)
+            elif word_lower_set & DIGITS:
+                match_at_ends.add(word_lower)
+            else:
+                match_anywhere.add(word_lower)
+        self._exact_match = frozenset(exact_match)
+        # words at the end are matched at the start of the reversed sqid
+        self._match_at_start = _words_regex(match_at_ends)
+        self._match_at_end = _words_regex([word[::-1] for word in match_at_ends])
+        self._match_anywhere = _words_regex(match_anywhere)
+
+    def _build_table(self, rotated):
+        alphabet = rotated[::-1]
+        shuffled = _shuffle(alphabet)
+        padding = [alphabet[0]]
+        padding_length = 1
+        while padding_length < self.min_length:
+            padding.append(shuffled)
+            padding_length += len(shuffled)
+            shuffled = _shuffle(shuffled)
+        digits = alphabet[1:]
+        return _Table(
+            prefix=rotated[0],
+            separator=alphabet[0],
+            digits=digits,
+            digit_index={char: index for index, char in enumerate(digits)},
+            padding="".join(padding)[: self.min_length],
+            next=_shuffle(alphabet)[0],
+        )
+
+    def encode(self, number):
+        """
+        Encode a non-negative integer into a sqid.
+        """
+        if not 0 <= number <= sys.maxsize:
+            raise ValueError(f"Encoding supports numbers between 0 and {sys.maxsize}")
+        min_length = self.min_length
+        offset = self._ords[number % self._length] + 1
+        for increment in range(self._length + 1):
+            table = self._tables[(offset + increment) % self._length]
+            id_ = table.prefix + self._to_id(number, table.digits)
+            if len(id_) < min_length:
+                id_ += table.padding[: min_length - len(id_)]
+            if len(id_) < 3 or not self.is_blocked(id_):
+                return id_
+        raise ValueError("Reached max attempts to re-generate the ID")
+
+    def _to_id(self, number, digits):
+        base = self._base
+        chars = []
+        while True:
+            number, remainder = divmod(number, base)
+            chars.append(digits[remainder])
+            if not number:
+                break
+        return "".join(reversed(chars))
+
+    def decode(self, id_):
+        """
+        Decode a sqid, or return ``None`` if it does not contain exactly one number.
+        """
+        if len(id_) < 2 or not self._chars.issuperset(id_):
+            return None
+        table = self._tables[self._offsets[id_[0]]]
+        chunk, separator, rest = id_[1:].partition(table.separator)
+        if not chunk:
+            return None
+        # anything after the padding separator would be another number
+        if separator and rest and rest[0] != table.next:
+            return None
+        digit_index = table.digit_index
+        base = self._base
+        number = 0
+        for char in chunk:
+            number = number * base + digit_index[char]
+        return number
+
+    def is_blocked(self, id_):
+        id_ = id_.lower()
+        if len(id_) == 3:
+            return id_ in self._exact_match
+        if self._match_at_start is not None and (
+            self._match_at_start.match(id_) or self._match_at_end.match(id_[::-1])
+        ):
+            return True
+        return (
+            self._match_anywhere is not None
+            and self._match_anywhere.search(id_) is not None
+        )
+
+
+class SqidsAdapter:
+    """
+    Use a ``sqids.Sqids`` instance with the interface of :class:`SqidsCodec`.
+    """
+
+    # the alphabet of a Sqids instance is private, so accept anything but a
+    # slash like the str path converter
+    pattern = "[^/]+"
+
+    def __init__(self, sqids_instance):
+        self.sqids_instance = sqids_instance
+
+    def encode(self, number):
+        return self.sqids_instance.encode([number])
+
+    def decode(self, id_):
+        numbers = self.sqids_instance.decode(id_)
+        if len(numbers) != 1:
+            return None
+        return numbers[0]
+
+
+class CompositeSqidsAdapter(SqidsAdapter):
+    """
+    Encode and decode tuples of a fixed number of integers with a ``sqids.Sqids``.
+
+    :param sqids_instance: The Sqids instance used to encode.
+    :param int size: The number of integers in each sqid.
+
+    """
+
+    def __init__(self, sqids_instance, size):
+        super().__init__(sqids_instance)
+        self.size = size
+
+    def encode(self, numbers):
+        return self.sqids_instance.encode(list(numbers))
+
+    def decode(self, id_):
+        numbers = self.sqids_instance.decode(id_)
+        if len(numbers) != self.size:
+            return None
+        return tuple(numbers)
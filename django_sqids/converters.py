@@ -0,0 +1,57 @@
+from django.urls import register_converter
+
+from .field import get_sqids_field_by_label
+
+
+class SqidsConverter:
+    """
+    A path converter that decodes the sqids of a SqidsField.
+
+    Values that are not valid sqids of the field do not match the URL, so
+    the view is not called. The view receives the decoded integer and
+    ``reverse()`` encodes integers. Use :func:`sqids_converter` to create a
+    converter for a field.
+    """
+
+    field_label = None
+
+    @property
+    def field(self):
+        return get_sqids_field_by_label(self.field_label)
+
+    @property
+    def regex(self):
+        return self.field.sqid_regex.pattern
+
+    def to_python(self, value):
+        decoded = self.field.decode(value)
+        if decoded is None:
+            raise ValueError("Invalid sqid: %r" % value)
+        return decoded
+
+    def to_url(self, value):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("Expected an integer, got %r" % value)
+        return self.field.encode(value)
+
+
+def sqids_converter(field):
+    """
+    Return a path converter class for a SqidsField.
+
+    :param field: The SqidsField, or its label as ``"app_label.Model.field"``.
+
+    """
+    field_label = field if isinstance(field, str) else str(field)
+    return type("SqidsConverter", (SqidsConverter,), {"field_label": field_label})
+
+
+def register_sqids_converter(field, type_name):
+    """
+    Register a path converter for a SqidsField, e.g. ``<item_sqid:pk>``.
+
+    :param field: The SqidsField, or its label as ``"app_label.Model.field"``.
+    :param str type_name: The name used in URL patterns.
+
+    """
+    register_converter(sqids_converter(field), type_name)
@@ -0,0 +1,120 @@
+import functools
+
+from django.db import NotSupportedError
+from django.db.models import CharField, Func, Value
+
+from .field import get_sqids_field_by_label
+
+ENCODE_FUNCTION = "DJANGO_SQIDS_ENCODE"
+
+
+def _sqlite_encode(value, label):
+    if value is None:
+        return None
+    return get_sqids_field_by_label(label).encode(value)
+
+
+def register_functions(connection, **kwargs):
+    """
+    Register the SQL functions used by :class:`SqidEncode` on a SQLite connection.
+
+    Connected to ``connection_created`` when the app is ready, so every new
+    connection has the functions.
+    """
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            ENCODE_FUNCTION, 2, _sqlite_encode, deterministic=True
+        )
+
+
+def _not_supported(connection):
+    return NotSupportedError(
+        "SqidEncode can only be selected on %s, it can't be filtered on or used "
+        "in other expressions and subqueries." % connection.display_name
+    )
+
+
+class SqliteOnlyLookupMixin:
+    """
+    Filter on :class:`SqidEncode` only where the database encodes the sqids.
+    """
+
+    def as_sql(self, compiler, connection):
+        raise _not_supported(connection)
+
+    def as_sqlite(self, compiler, connection):
+        return super().as_sql(compiler, connection)
+
+
+@functools.lru_cache(maxsize=None)
+def sqlite_only_lookup(lookup_class):
+    """
+    Return a version of a lookup that raises ``NotSupportedError`` on other
+    databases than SQLite.
+    """
+    # vendor specific versions of the lookup would bypass as_sql
+    vendor_methods = {
+        name: SqliteOnlyLookupMixin.as_sql
+        for name in dir(lookup_class)
+        if name.startswith("as_") and name not in ("as_sql", "as_sqlite")
+    }
+    return type(
+        "SqliteOnly%s" % lookup_class.__name__,
+        (SqliteOnlyLookupMixin, lookup_class),
+        vendor_methods,
+    )
+
+
+class SqidEncode(Func):
+    """
+    Encode an integer expression with the configuration of a SqidsField.
+
+    On SQLite the sqid is computed by the database, so it can be used to
+    order, group and in subqueries. Other databases select the integer and
+    the sqid is encoded in Python, ordering uses the integer. Filtering or
+    using the expression inside other expressions raises
+    ``NotSupportedError`` there.
+
+    :param expression: The integer expression or field name to encode.
+    :param field: The SqidsField, or its label as ``"app_label.Model.field"``.
+
+    """
+
+    function = ENCODE_FUNCTION
+    output_field = CharField()
+
+    def __init__(self, expression, field, **extra):
+        self.field_label = field if isinstance(field, str) else str(field)
+        super().__init__(expression, Value(self.field_label), **extra)
+
+    @property
+    def field(self):
+        return get_sqids_field_by_label(self.field_label)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # the integer is encoded by a converter of the selected column, anywhere
+        # else it would silently stay an integer
+        query = compiler.query
+        if query.subquery or not any(
+            annotation is self for annotation in query.annotation_select.values()
+        ):
+            raise _not_supported(connection)
+        return compiler.compile(self.get_source_expressions()[0])
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, **extra_context)
+
+    def get_lookup(self, lookup_name):
+        lookup = super().get_lookup(lookup_name)
+        return lookup and sqlite_only_lookup(lookup)
+
+    def get_db_converters(self, connection):
+        converters = super().get_db_converters(connection)
+        if connection.vendor != "sqlite":
+            converters.insert(0, self.encode_value)
+        return converters
+
+    def encode_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return self.field.encode(value)
@@ -1,13 +1,35 @@
+import functools
 import random
+import re
+from time import perf_counter
 
+from django.apps import apps
 from django.conf import settings
-from django.core.exceptions import FieldError
+from django.core.exceptions import FieldDoesNotExist, FieldError
 from django.db.models import CharField, Field
+from django.db.models.signals import post_save
 from django.utils.functional import cached_property
-from sqids import Sqids
-from sqids.constants import DEFAULT_ALPHABET, DEFAULT_MIN_LENGTH
+from sqids.constants import DEFAULT_ALPHABET
 
+from . import metrics
+from .cache import LRUCache
+from .codec import CompositeSqidsAdapter, SqidsAdapter
 from .exceptions import ConfigError, RealFieldDoesNotExistError
+from .lookups import (
+    CompositeCol,
+    SqidsCompositeExact,
+    SqidsCompositeIn,
+    SqidsCompositeIsNull,
+    SqidsExact,
+    SqidsGreaterThan,
+    SqidsGreaterThanOrEqual,
+    SqidsIn,
+    SqidsLessThan,
+    SqidsLessThanOrEqual,
+    stored_lookup,
+)
+from .registry import get_codec, get_sqids
+from .versions import resolve_config
 
 
 def shuffle_alphabet(seed, alphabet=None):
@@ -25,9 +47,49 @@ def shuffle_alphabet(seed, alphabet=None):
     return "".join(letters)
 
 
+class StoredSqidsField(CharField):
+    """
+    The column holding the sqids of a ``SqidsField(store=True)``.
+
+    The value is computed when the row is saved, migrations see a plain
+    ``CharField``.
+    """
+
+    def __init__(self, *args, sqids_field_name=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sqids_field_name = sqids_field_name
+
+    def pre_save(self, model_instance, add):
+        # empty until the real field has a value, e.g. an autoincrement pk
+        value = getattr(model_instance, self.sqids_field_name) or None
+        setattr(model_instance, self.attname, value)
+        return value
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, "django.db.models.CharField", args, kwargs
+
+
 class SqidsField(CharField):
     concrete = False
     allowed_lookups = ("exact", "in", "gt", "gte", "lt", "lte", "isnull")
+    # text lookups that use the stored column with store=True
+    stored_lookups = (
+        "iexact",
+        "contains",
+        "icontains",
+        "startswith",
+        "istartswith",
+        "endswith",
+        "iendswith",
+        "regex",
+        "iregex",
+    )
+    # lookups of fields with several real fields
+    composite_lookups = {
+        lookup.lookup_name: lookup
+        for lookup in (SqidsCompositeExact, SqidsCompositeIn, SqidsCompositeIsNull)
+    }
 
     def __init__(
         self,
@@ -37,22 +99,65 @@ class SqidsField(CharField):
         alphabet=None,
         min_length=None,
         prefix="",
+        cache_size=None,
+        store=False,
+        codec_from=None,
+        legacy_versions=None,
+        blocklist=None,
         **kwargs,
     ):
         kwargs.pop("editable", None)
         super().__init__(*args, editable=False, **kwargs)
+        # several real fields are encoded into a single sqid
+        self.composite = isinstance(real_field_name, (tuple, list))
+        if self.composite:
+            real_field_name = tuple(real_field_name)
         self.real_field_name = real_field_name
         self.min_length = min_length
         self.alphabet = alphabet
         self.prefix = prefix
+        self.cache_size = cache_size
+        self.store = store
+        self.codec_from = codec_from
+        self.legacy_versions = tuple(legacy_versions or ())
+        self.blocklist = None if blocklist is None else tuple(blocklist)
         self._explicit_sqids_instance = sqids_instance
+        if sqids_instance and (
+            alphabet is not None or min_length is not None or blocklist is not None
+        ):
+            raise ConfigError(
+                "if sqids_instance is set, min_length, alphabet and blocklist "
+                "should not be set"
+            )
+        if codec_from and (
+            sqids_instance
+            or alphabet is not None
+            or min_length is not None
+            or blocklist is not None
+            or prefix
+        ):
+            raise ConfigError(
+                "if codec_from is set, sqids_instance, min_length, alphabet, "
+                "blocklist and prefix should not be set"
+            )
+        if self.legacy_versions:
+            if codec_from or self.composite:
+                raise ConfigError(
+                    "legacy_versions can't be used with codec_from or several "
+                    "real fields"
+                )
+            prefixes = [prefix] + [version.prefix for version in self.legacy_versions]
+            if len(set(prefixes)) != len(prefixes):
+                raise ConfigError("every version needs a different prefix")
 
-        self.sqids_instance = None
+        self._sqids_instance = None
+        self._codec = None
         self.attached_to_model = None
 
     def contribute_to_class(self, cls, name):
         self.attname = name
         self.name = name
+        self.cache_attname = "_%s_cache" % name
 
         if getattr(self, "model", None) is None and cls._meta.abstract is False:
             self.model = cls
@@ -73,96 +178,458 @@ class SqidsField(CharField):
 
         cls._meta.add_field(self, private=True)
 
-        self.sqids_instance = self.get_sqid_instance()
+        if self.legacy_versions:
+            self.check_version_prefixes(cls)
+        if self.store:
+            self.contribute_stored_field(cls)
+
+    def contribute_stored_field(self, cls):
+        self.stored_field_name = "%s_stored" % self.name
+        # children of abstract models already inherited the column, children
+        # of concrete models use the column of their parent
+        inherited = getattr(self, "mti_inherited", False) or any(
+            field.name == self.stored_field_name for field in cls._meta.local_fields
+        )
+        if not inherited:
+            stored_field = StoredSqidsField(
+                max_length=self.max_length or 255,
+                db_column=self.db_column or self.name,
+                db_index=self.db_index,
+                unique=self._unique,
+                null=True,
+                editable=False,
+                sqids_field_name=self.name,
+            )
+            cls.add_to_class(self.stored_field_name, stored_field)
+        if not cls._meta.abstract:
+            post_save.connect(self.update_stored_value, sender=cls, weak=False)
+
+    @property
+    def sqids_instance(self):
+        # built on first use, most management commands never encode anything
+        if self._sqids_instance is None:
+            self._sqids_instance = self.get_sqid_instance()
+        return self._sqids_instance
+
+    @sqids_instance.setter
+    def sqids_instance(self, value):
+        self._sqids_instance = value
+        self._codec = None if value is None else self.get_adapter(value)
+        self.__dict__.pop("sqid_regex", None)
+        self.__dict__.pop("active_regex", None)
+        self.cache_clear()
+
+    @property
+    def prefix(self):
+        if self.codec_from:
+            return self.codec_source.prefix
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, value):
+        self._prefix = value
+
+    @cached_property
+    def codec_source(self):
+        """
+        The SqidsField of the model referenced by ``codec_from``.
+        """
+        related_model = self.attached_to_model._meta.get_field(
+            self.codec_from
+        ).related_model
+        return get_sqids_field(related_model)
+
+    @property
+    def codec(self):
+        if self._codec is None:
+            self._codec = self.get_codec()
+        return self._codec
+
+    def get_sqids_config(self):
+        if self.codec_from:
+            return self.codec_source.get_sqids_config()
+        return resolve_config(self.alphabet, self.min_length, self.blocklist)
 
     def get_sqid_instance(self):
+        if self.codec_from:
+            return self.codec_source.sqids_instance
         if self._explicit_sqids_instance:
-            if self.alphabet is not None or self.min_length is not None:
-                raise ConfigError(
-                    "if sqids_instance is set, min_length and alphabet should not be set"
-                )
             return self._explicit_sqids_instance
-        min_length = self.min_length
-        alphabet = self.alphabet
-        if min_length is None:
-            min_length = (
-                getattr(settings, "DJANGO_SQIDS_MIN_LENGTH", None) or DEFAULT_MIN_LENGTH
-            )
-        if alphabet is None:
-            alphabet = (
-                getattr(settings, "DJANGO_SQIDS_ALPHABET", None) or DEFAULT_ALPHABET
-            )
-        return Sqids(min_length=min_length, alphabet=alphabet)
+        return get_sqids(**self.get_sqids_config())
+
+    def get_codec(self):
+        """
+        Return the codec used to encode and decode the values of this field.
+
+        Unless the field uses its own ``sqids_instance``, this is a shared
+        :class:`~django_sqids.codec.SqidsCodec` specialized for single integers.
+        Composite fields encode tuples with the shared Sqids instance, fields with
+        ``codec_from`` use the codec of the related SqidsField.
+        """
+        if self.codec_from:
+            return self.codec_source.codec
+        if self._explicit_sqids_instance or self.composite:
+            return self.get_adapter(self.get_sqid_instance())
+        return get_codec(**self.get_sqids_config())
+
+    def get_adapter(self, sqids_instance):
+        if self.composite:
+            return CompositeSqidsAdapter(sqids_instance, len(self.real_field_name))
+        return SqidsAdapter(sqids_instance)
+
+    @cached_property
+    def encode_cache(self):
+        return self.get_cache()
+
+    @cached_property
+    def decode_cache(self):
+        return self.get_cache()
+
+    def get_cache(self):
+        cache_size = self.cache_size
+        if cache_size is None:
+            cache_size = getattr(settings, "DJANGO_SQIDS_CACHE_SIZE", None) or 0
+        if not cache_size:
+            return None
+        return LRUCache(cache_size)
+
+    def cache_info(self):
+        """
+        Report statistics of the encode and decode caches.
+
+        Returns ``None`` if caching is disabled for this field.
+        """
+        if self.encode_cache is None:
+            return None
+        return {
+            "encode": self.encode_cache.info(),
+            "decode": self.decode_cache.info(),
+        }
+
+    def cache_clear(self):
+        for cache in (self.encode_cache, self.decode_cache):
+            if cache is not None:
+                cache.clear()
+
+    def encode(self, value):
+        """
+        Encode an integer into a sqid, including the prefix.
+        """
+        started = perf_counter() if metrics.enabled else None
+        cache = self.encode_cache
+        cache_hit = None
+        encoded_value = LRUCache.MISSING
+        if cache is not None:
+            encoded_value = cache.get(value)
+            cache_hit = encoded_value is not LRUCache.MISSING
+        if encoded_value is LRUCache.MISSING:
+            encoded_value = f"{self.prefix}{self.codec.encode(value)}"
+            if cache is not None:
+                cache.set(value, encoded_value)
+        if started is not None:
+            self._record_metrics("encode", started, cache_hit=cache_hit)
+        return encoded_value
+
+    def encode_many(self, values):
+        """
+        Encode a sequence of integers, encoding repeated values only once.
+
+        ``None`` values are passed through. The cache is bypassed so that large
+        batches do not evict frequently used sqids.
+        """
+        started = perf_counter() if metrics.enabled else None
+        codec = self.codec
+        prefix = self.prefix
+        encoded = {
+            value: f"{prefix}{codec.encode(value)}"
+            for value in set(values)
+            if value is not None
+        }
+        if started is not None:
+            self._record_metrics("encode", started, calls=len(encoded))
+        return [encoded.get(value) for value in values]
+
+    def decode(self, value):
+        """
+        Decode a sqid into an integer, or return ``None`` if it is not valid.
+        """
+        started = perf_counter() if metrics.enabled else None
+        cache = self.decode_cache
+        cache_hit = None
+        decoded_value = LRUCache.MISSING
+        if cache is not None:
+            decoded_value = cache.get(value)
+            cache_hit = decoded_value is not LRUCache.MISSING
+        if decoded_value is LRUCache.MISSING:
+            decoded_value = self._decode(value)
+            if cache is not None:
+                cache.set(value, decoded_value)
+        if started is not None:
+            self._record_metrics("decode", started, cache_hit=cache_hit)
+            if decoded_value is None:
+                self._record_decode_failure(value)
+        return decoded_value
+
+    def _decode(self, value):
+        if self.legacy_versions:
+            return self._decode_versioned(value)
+        if not self.is_valid_sqid(value):
+            return None
+        return self.codec.decode(value[len(self.prefix) :])
+
+    @cached_property
+    def versions_by_prefix(self):
+        # prefix lengths, longest first, with the versions using a prefix of
+        # that length. `None` is the current version.
+        by_length = {}
+        for version in (None, *self.legacy_versions):
+            prefix = self.prefix if version is None else version.prefix
+            by_length.setdefault(len(prefix), {})[prefix] = version
+        return sorted(by_length.items(), key=lambda item: item[0], reverse=True)
+
+    def check_version_prefixes(self, cls):
+        """
+        Raise a ``ConfigError`` if a sqid of a version can start with the
+        prefix of another version.
+
+        A sqid is decoded by the version with the longest matching prefix, so
+        a longer prefix needs a character that is not in the alphabet of the
+        shorter one.
+        """
+        # the alphabet of a sqids_instance is unknown
+        alphabets = {
+            self.prefix: None
+            if self._explicit_sqids_instance
+            else resolve_config(self.alphabet, self.min_length)["alphabet"]
+        }
+        alphabets.update(
+            (version.prefix, resolve_config(version.alphabet)["alphabet"])
+            for version in self.legacy_versions
+        )
+        for prefix, alphabet in alphabets.items():
+            for other in alphabets:
+                if other == prefix or not other.startswith(prefix):
+                    continue
+                if alphabet is None or set(other[len(prefix) :]) <= set(alphabet):
+                    raise ConfigError(
+                        "the prefix %r of %s.%s can be the start of sqids with "
+                        "the prefix %r" % (other, cls.__name__, self.name, prefix)
+                    )
+
+    def _decode_versioned(self, value):
+        if not isinstance(value, str):
+            return None
+        # one dictionary lookup per distinct prefix length
+        for length, versions in self.versions_by_prefix:
+            if value[:length] in versions:
+                version = versions[value[:length]]
+                break
+        else:
+            return None
+        if version is None:
+            if self.active_regex.fullmatch(value) is None:
+                return None
+            return self.codec.decode(value[length:])
+        if version.regex.fullmatch(value) is None:
+            return None
+        decoded_value = version.codec.decode(value[length:])
+        if decoded_value is not None:
+            version.record_hit()
+            if metrics.enabled:
+                metrics.record(self.metrics_key, decode_legacy_hits=1)
+        return decoded_value
+
+    def legacy_hits(self):
+        """
+        Return the number of sqids decoded with each legacy version, by prefix.
+
+        Sqids served from the decode cache are not counted again.
+        """
+        return {version.prefix: version.hits for version in self.legacy_versions}
+
+    @property
+    def metrics_key(self):
+        return "%s.%s" % (self.attached_to_model._meta.label, self.name)
+
+    def _record_metrics(self, kind, started, cache_hit=None, calls=1):
+        counts = {f"{kind}_calls": calls, f"{kind}_time": perf_counter() - started}
+        if cache_hit is not None:
+            counts["cache_hits" if cache_hit else "cache_misses"] = 1
+        metrics.record(self.metrics_key, **counts)
+
+    def _record_decode_failure(self, value):
+        if not isinstance(value, str) or not value.startswith(self.prefix):
+            reason = "prefix"
+        elif len(self.sqids_instance.decode(value[len(self.prefix) :])) > (
+            len(self.real_field_name) if self.composite else 1
+        ):
+            reason = "multiple"
+        else:
+            reason = "invalid"
+        metrics.record(self.metrics_key, **{f"decode_failures_{reason}": 1})
+
+    @cached_property
+    def active_regex(self):
+        return re.compile(re.escape(self.prefix) + self.codec.pattern)
+
+    @cached_property
+    def sqid_regex(self):
+        if not self.legacy_versions:
+            return self.active_regex
+        patterns = [self.active_regex.pattern]
+        patterns += [version.pattern for version in self.legacy_versions]
+        return re.compile("(?:%s)" % "|".join(patterns))
+
+    def is_valid_sqid(self, value):
+        """
+        Check if a value looks like a sqid of this field, without decoding it.
+
+        The prefix, the characters and the length are checked, so most invalid
+        values are rejected early. Values that pass may still fail to decode.
+        """
+        return isinstance(value, str) and self.sqid_regex.fullmatch(value) is not None
 
     def get_internal_type(self):
         return "CharField"
 
     def get_prep_value(self, value):
-        if self.prefix:
-            if value.startswith(self.prefix):
-                value = value[len(self.prefix) :]
-            else:
-                return None
-        decoded_values = self.sqids_instance.decode(value)
-        if not decoded_values:
-            return None
-        if len(decoded_values) > 1:
-            return None
-        return decoded_values[0]
+        return self.decode(value)
 
     def from_db_value(self, value, expression, connection, *args):
-        # Prepend the prefix when encoding for display
-        encoded_value = self.sqids_instance.encode([value])
-        return f"{self.prefix}{encoded_value}" if encoded_value is not None else None
+        if value is None:
+            return None
+        return self.encode(value)
 
     def get_col(self, alias, output_field=None):
         if output_field is None:
             output_field = self
+        if self.composite:
+            return CompositeCol(alias, self.real_cols, output_field)
         col = self.real_col.get_col(alias, output_field)
         return col
 
     @cached_property
     def real_col(self):
+        if self.composite:
+            raise ConfigError(
+                "%s has several real fields, use real_cols instead of real_col" % self
+            )
+        return self.get_real_field(self.real_field_name)
+
+    @cached_property
+    def real_cols(self):
+        return tuple(self.get_real_field(name) for name in self.real_field_name)
+
+    def get_real_field(self, real_field_name):
         # `maybe_field` is intended for `pk`, which does not appear in `_meta.fields`
-        maybe_field = getattr(self.attached_to_model._meta, self.real_field_name, None)
+        maybe_field = getattr(self.attached_to_model._meta, real_field_name, None)
         if isinstance(maybe_field, Field):
             return maybe_field
         try:
             field = next(
                 col
                 for col in self.attached_to_model._meta.fields
-                if col.name == self.real_field_name
-                or col.attname == self.real_field_name
+                if col.name == real_field_name or col.attname == real_field_name
             )
         except StopIteration:
             raise RealFieldDoesNotExistError(
                 "%s(%s) can't find real field using real_field_name: %s"
-                % (self.__class__.__name__, self, self.real_field_name)
+                % (self.__class__.__name__, self, real_field_name)
             )
         return field
 
+    def get_real_value(self, instance):
+        """
+        Return the value of the real field of an instance, a tuple for
+        composite fields, or ``None`` if it is not set.
+        """
+        if not self.composite:
+            return getattr(instance, self.real_field_name, None)
+        values = tuple(getattr(instance, name, None) for name in self.real_field_name)
+        return None if None in values else values
+
+    def get_real_filter(self, value):
+        """
+        Return the keyword arguments to filter the real field by a decoded value.
+        """
+        if not self.composite:
+            return {self.real_field_name: value}
+        return dict(zip(self.real_field_name, value))
+
+    @cached_property
+    def stored_field(self):
+        return self.attached_to_model._meta.get_field(self.stored_field_name)
+
+    def update_stored_value(self, sender, instance, using=None, **kwargs):
+        # rows inserted without a value for the real field only know it now
+        attname = self.stored_field.attname
+        value = getattr(instance, self.name) or None
+        if instance.__dict__.get(attname) != value:
+            setattr(instance, attname, value)
+            sender._base_manager.using(using).filter(pk=instance.pk).update(
+                **{attname: value}
+            )
+
+    def sync_stored_values(self, objs, using=None, batch_size=None):
+        """
+        Update the stored sqids of objects that are missing or out of date.
+
+        Returns the number of objects updated.
+
+        :param objs: The objects to check, they must be saved.
+        :param str using: The database alias to update.
+        :param int batch_size: Maximum number of objects updated per query.
+
+        """
+        attname = self.stored_field.attname
+        changed = []
+        for obj in objs:
+            value = getattr(obj, self.name) or None
+            if value is not None and obj.__dict__.get(attname) != value:
+                setattr(obj, attname, value)
+                changed.append(obj)
+        if changed:
+            self.attached_to_model._base_manager.using(using).bulk_update(
+                changed, [self.stored_field_name], batch_size=batch_size
+            )
+        return len(changed)
+
     def __get__(self, instance, name=None):
         if not instance:
             return self
-        real_value = getattr(instance, self.real_field_name, None)
+        real_value = self.get_real_value(instance)
         # the instance is not saved yet?
         if real_value is None:
             return ""
-        assert isinstance(real_value, int)
-        # Prepend the prefix when encoding for display
-        encoded_value = self.sqids_instance.encode([real_value])
-        return f"{self.prefix}{encoded_value}"
+        # reuse the sqid computed for the current value of the real field
+        cached = instance.__dict__.get(self.cache_attname)
+        if cached is not None and cached[0] == real_value:
+            return cached[1]
+        assert isinstance(real_value, tuple if self.composite else int)
+        encoded_value = self.encode(real_value)
+        instance.__dict__[self.cache_attname] = (real_value, encoded_value)
+        return encoded_value
 
     def __set__(self, instance, value):
         pass
 
     def __deepcopy__(self, memo=None):
         new_instance = super().__deepcopy__(memo)
-        for attr in ("sqids_instance", "attached_to_model"):
+        for attr in ("_sqids_instance", "_codec", "attached_to_model"):
             if hasattr(new_instance, attr):
                 setattr(new_instance, attr, None)
         # remove cached values from cached_property
-        for key in ("real_col",):
+        for key in (
+            "real_col",
+            "real_cols",
+            "stored_field",
+            "codec_source",
+            "encode_cache",
+            "decode_cache",
+            "active_regex",
+            "sqid_regex",
+            "versions_by_prefix",
+        ):
             if key in new_instance.__dict__:
                 del new_instance.__dict__[key]  # pragma: no cover
         return new_instance
@@ -171,3 +638,52 @@ class SqidsField(CharField):
     def get_lookups(cls):
         all_lookups = super().get_lookups()
         return {k: all_lookups[k] for k in cls.allowed_lookups}
+
+    def get_lookup(self, lookup_name):
+        if self.composite:
+            return self.composite_lookups.get(lookup_name)
+        if self.store and lookup_name in self.stored_lookups:
+            return stored_lookup(CharField.get_lookups()[lookup_name])
+        return super().get_lookup(lookup_name)
+
+
+for lookup in (
+    SqidsExact,
+    SqidsIn,
+    SqidsGreaterThan,
+    SqidsGreaterThanOrEqual,
+    SqidsLessThan,
+    SqidsLessThanOrEqual,
+):
+    SqidsField.register_lookup(lookup)
+
+
+def get_sqids_field(model, field_name=None):
+    """
+    Return the SqidsField of a model.
+
+    Without a name, fields with ``codec_from`` are skipped since they encode
+    the keys of related objects.
+
+    :param model: The model class or instance to inspect.
+    :param str field_name: Name of the field, if the model has more than one.
+
+    """
+    for field in model._meta.private_fields:
+        if not isinstance(field, SqidsField):
+            continue
+        if (field_name is None and not field.codec_from) or field_name == field.name:
+            return field
+    raise FieldDoesNotExist(
+        "%s has no SqidsField%s"
+        % (model._meta.object_name, " named '%s'" % field_name if field_name else "")
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_sqids_field_by_label(label):
+    """
+    Return the SqidsField with a label like ``"app_label.Model.field"``.
+    """
+    model_label, field_name = label.rsplit(".", 1)
+    return get_sqids_field(apps.get_model(model_label), field_name)
@@ -0,0 +1,173 @@
+from functools import lru_cache
+
+from django.core.exceptions import EmptyResultSet, FieldError
+from django.db.models import Expression, lookups
+from django.db.models.sql.where import AND, OR, WhereNode
+
+
+class SqidsLookupMixin:
+    """
+    Skip the query if the sqid could not be decoded, it can't match any row.
+    """
+
+    def get_prep_lookup(self):
+        rhs = super().get_prep_lookup()
+        # keep this lookup for sqids that could not be decoded, a plain None
+        # is still turned into an isnull lookup
+        self.can_use_none_as_rhs = rhs is None and self.rhs is not None
+        return rhs
+
+    def process_rhs(self, compiler, connection):
+        if self.rhs is None:
+            raise EmptyResultSet
+        return super().process_rhs(compiler, connection)
+
+
+class SqidsExact(SqidsLookupMixin, lookups.Exact):
+    pass
+
+
+class SqidsGreaterThan(SqidsLookupMixin, lookups.GreaterThan):
+    pass
+
+
+class SqidsGreaterThanOrEqual(SqidsLookupMixin, lookups.GreaterThanOrEqual):
+    pass
+
+
+class SqidsLessThan(SqidsLookupMixin, lookups.LessThan):
+    pass
+
+
+class SqidsLessThanOrEqual(SqidsLookupMixin, lookups.LessThanOrEqual):
+    pass
+
+
+class SqidsIn(lookups.In):
+    def get_prep_lookup(self):
+        rhs = super().get_prep_lookup()
+        if self.rhs_is_direct_value():
+            # drop sqids that could not be decoded and duplicates, an empty
+            # list raises EmptyResultSet when compiled
+            rhs = list(dict.fromkeys(value for value in rhs if value is not None))
+        return rhs
+
+
+class StoredSqidsLookupMixin:
+    """
+    Match the stored sqid column instead of the real field.
+    """
+
+    def __init__(self, lhs, rhs):
+        stored_field = lhs.output_field.stored_field
+        super().__init__(stored_field.get_col(lhs.alias), rhs)
+
+
+@lru_cache(maxsize=None)
+def stored_lookup(lookup_class):
+    """
+    Return a version of a text lookup that uses the stored sqid column.
+    """
+    return type(
+        "Stored%s" % lookup_class.__name__, (StoredSqidsLookupMixin, lookup_class), {}
+    )
+
+
+class CompositeCol(Expression):
+    """
+    The real columns of a composite SqidsField.
+
+    They can only be used by the composite lookups, which expand to a
+    condition on each column.
+    """
+
+    def __init__(self, alias, targets, output_field):
+        super().__init__(output_field=output_field)
+        self.alias = alias
+        self.targets = targets
+        self.cols = [target.get_col(alias) for target in targets]
+
+    def get_source_expressions(self):
+        return self.cols
+
+    def set_source_expressions(self, exprs):
+        self.cols = exprs
+
+    def relabeled_clone(self, relabels):
+        return self.__class__(
+            relabels.get(self.alias, self.alias), self.targets, self.output_field
+        )
+
+    def get_group_by_cols(self):
+        return list(self.cols)
+
+    def as_sql(self, compiler, connection):
+        raise FieldError(
+            "%s uses several columns and can only be used in filters."
+            % self.output_field.name
+        )
+
+
+class SqidsCompositeExact(lookups.Lookup):
+    lookup_name = "exact"
+
+    def get_prep_lookup(self):
+        rhs = super().get_prep_lookup()
+        self.can_use_none_as_rhs = rhs is None and self.rhs is not None
+        return rhs
+
+    def as_sql(self, compiler, connection):
+        if self.rhs is None:
+            raise EmptyResultSet
+        if hasattr(self.rhs, "resolve_expression"):
+            raise FieldError("Composite sqids can only be compared to values.")
+        where = WhereNode(
+            [lookups.Exact(col, value) for col, value in zip(self.lhs.cols, self.rhs)],
+            connector=AND,
+        )
+        return compiler.compile(where)
+
+
+class SqidsCompositeIn(lookups.Lookup):
+    lookup_name = "in"
+
+    def get_prep_lookup(self):
+        if hasattr(self.rhs, "resolve_expression"):
+            raise FieldError("Composite sqids can only be compared to values.")
+        field = self.lhs.output_field
+        decoded = (field.get_prep_value(sqid) for sqid in self.rhs)
+        return list(dict.fromkeys(value for value in decoded if value is not None))
+
+    def as_sql(self, compiler, connection):
+        if not self.rhs:
+            raise EmptyResultSet
+        # group by all but the last column, e.g. one IN per tenant
+        groups = {}
+        for value in self.rhs:
+            groups.setdefault(value[:-1], []).append(value[-1])
+        *cols, last_col = self.lhs.cols
+        where = WhereNode(
+            [
+                WhereNode(
+                    [lookups.Exact(col, value) for col, value in zip(cols, key)]
+                    + [lookups.In(last_col, values)],
+                    connector=AND,
+                )
+                for key, values in groups.items()
+            ],
+            connector=OR,
+        )
+        return compiler.compile(where)
+
+
+class SqidsCompositeIsNull(lookups.Lookup):
+    lookup_name = "isnull"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        # the sqid is empty if any of the columns is null
+        where = WhereNode(
+            [lookups.IsNull(col, self.rhs) for col in self.lhs.cols],
+            connector=OR if self.rhs else AND,
+        )
+        return compiler.compile(where)
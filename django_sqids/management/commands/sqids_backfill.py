@@ -0,0 +1,57 @@
+import time
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from django_sqids.field import get_sqids_field
+
+
+class Command(BaseCommand):
+    help = "Fill the stored sqids of existing rows of a model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="The model to backfill, as app_label.Model.")
+        parser.add_argument(
+            "--field", help="Name of the SqidsField, if the model has more than one."
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+            field = get_sqids_field(model, options["field"])
+        except (LookupError, FieldDoesNotExist) as e:
+            raise CommandError(e)
+        if not field.store:
+            raise CommandError(
+                "%s.%s does not use store=True" % (model._meta.label, field.name)
+            )
+
+        started = time.perf_counter()
+        rows = updated = 0
+        for chunk in self.iter_chunks(model, field, options["chunk_size"]):
+            updated += field.sync_stored_values(chunk)
+            rows += len(chunk)
+        self.stderr.write(
+            "Updated %d of %d rows in %.1fs"
+            % (updated, rows, time.perf_counter() - started),
+            style_func=self.style.SUCCESS,
+        )
+
+    def iter_chunks(self, model, field, chunk_size):
+        """
+        Yield the objects in chunks, using keyset pagination on the primary key.
+        """
+        real_cols = field.real_cols if field.composite else [field.real_col]
+        qs = model._base_manager.order_by("pk").only(
+            *(col.name for col in real_cols), field.stored_field_name
+        )
+        last = None
+        while True:
+            page = qs if last is None else qs.filter(pk__gt=last)
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1].pk
@@ -0,0 +1,133 @@
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from django_sqids.field import get_sqids_field
+
+_worker_codec = None
+_worker_prefix = ""
+
+
+def _init_worker(codec, prefix):
+    global _worker_codec, _worker_prefix
+    _worker_codec = codec
+    _worker_prefix = prefix
+
+
+def _encode_chunk(values):
+    return [f"{_worker_prefix}{_worker_codec.encode(value)}" for value in values]
+
+
+class Command(BaseCommand):
+    help = "Export the sqid of every row of a model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="The model to export, as app_label.Model.")
+        parser.add_argument(
+            "--field", help="Name of the SqidsField, if the model has more than one."
+        )
+        parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes encoding sqids.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10000)
+        parser.add_argument("--output", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+            field = get_sqids_field(model, options["field"])
+        except (LookupError, FieldDoesNotExist) as e:
+            raise CommandError(e)
+        if field.composite:
+            raise CommandError(
+                "%s.%s uses several real fields and can't be exported"
+                % (model._meta.label, field.name)
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                self.export(model, field, output, options)
+        else:
+            self.export(model, field, self.stdout, options)
+
+    def export(self, model, field, output, options):
+        started = time.perf_counter()
+        write = self.get_writer(output, field, options["format"])
+        chunks = self.iter_chunks(model, field, options["chunk_size"])
+        rows = 0
+        if options["workers"] > 1:
+            results = self.encode_in_processes(field, chunks, options["workers"])
+        else:
+            results = ((chunk, field.encode_many(chunk)) for chunk in chunks)
+        for chunk, sqids in results:
+            for value, sqid in zip(chunk, sqids):
+                write(value, sqid)
+            rows += len(chunk)
+        seconds = time.perf_counter() - started
+        self.stderr.write(
+            "Exported %d rows in %.1fs (%d rows/s)"
+            % (rows, seconds, rows / seconds if seconds else 0),
+            style_func=self.style.SUCCESS,
+        )
+
+    def iter_chunks(self, model, field, chunk_size):
+        """
+        Yield the values of the real field in chunks, using keyset pagination.
+        """
+        real_field_name = field.real_field_name
+        qs = model._default_manager.order_by(real_field_name).values_list(
+            real_field_name, flat=True
+        )
+        last = None
+        while True:
+            page = qs if last is None else qs.filter(**{f"{real_field_name}__gt": last})
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1]
+
+    def encode_in_processes(self, field, chunks, workers):
+        """
+        Encode chunks in a process pool, yielding them in order.
+
+        At most two chunks per worker are in flight to bound memory use.
+        """
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(field.codec, field.prefix),
+        ) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_encode_chunk, chunk)))
+                if len(pending) >= workers * 2:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+    def get_writer(self, output, field, format):
+        if format == "jsonl":
+
+            def write(value, sqid):
+                output.write(
+                    json.dumps({field.real_field_name: value, field.name: sqid}) + "\n"
+                )
+
+            return write
+
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow([field.real_field_name, field.name])
+        return lambda value, sqid: writer.writerow([value, sqid])
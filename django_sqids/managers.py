@@ -0,0 +1,410 @@
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connections, models, router, transaction
+from django.db.models.signals import class_prepared, post_delete, post_save
+
+from .field import SqidsField, get_sqids_field
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _achunks(iterable, size):
+    chunk = []
+    async for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _decode_sqids(field, sqids):
+    # map each decoded value to the sqids it was decoded from
+    decoded = {}
+    for sqid in sqids:
+        value = field.decode(sqid)
+        if value is not None:
+            decoded.setdefault(value, []).append(sqid)
+    return decoded
+
+
+def _by_sqid(decoded, objects):
+    return {
+        sqid: obj for value, obj in objects.items() for sqid in decoded.get(value, ())
+    }
+
+
+def _get_object_cache():
+    return caches[getattr(settings, "DJANGO_SQIDS_OBJECT_CACHE", DEFAULT_CACHE_ALIAS)]
+
+
+def _object_cache_key(field, value):
+    if field.composite:
+        value = ":".join(str(v) for v in value)
+    return "django_sqids:%s.%s:%s" % (
+        field.attached_to_model._meta.label_lower,
+        field.name,
+        value,
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_cached_fields(model):
+    # the SqidsFields whose objects may be cached, a saved child also changes
+    # the cached objects of its parents
+    return tuple(
+        field
+        for model in (model, *model._meta.get_parent_list())
+        if any(
+            issubclass(getattr(manager, "_queryset_class", object), SqidsQuerySet)
+            for manager in model._meta.managers
+        )
+        for field in model._meta.private_fields
+        if isinstance(field, SqidsField)
+    )
+
+
+def _invalidate_cached_objects(sender, instance, using=None, **kwargs):
+    keys = []
+    for field in _get_cached_fields(sender):
+        value = field.get_real_value(instance)
+        if value is not None:
+            keys.append(_object_cache_key(field, value))
+    if not keys:
+        return
+    cache = _get_object_cache()
+    cache.delete_many(keys)
+    using = using or instance._state.db or router.db_for_write(sender)
+    # other connections may cache the old row again until the change is committed
+    if connections[using].in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+class SqidsQuerySet(models.QuerySet):
+    def _does_not_exist(self):
+        return self.model.DoesNotExist(
+            "%s matching query does not exist." % self.model._meta.object_name
+        )
+
+    def create(self, **kwargs):
+        """
+        Create an object like ``QuerySet.create``, saved to the database that
+        routers return for the object.
+
+        See :class:`~django_sqids.routers.SqidsShardRouter`.
+        """
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db_for_object(obj))
+        return obj
+
+    def _db_for_object(self, obj):
+        return router.db_for_write(self.model, **{**self._hints, "instance": obj})
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Create objects like ``QuerySet.bulk_create``, then store their sqids.
+
+        Primary keys set by the database are only known after the insert, so
+        the stored sqids of those objects are written with one extra
+        ``bulk_update``. Unless the queryset uses a fixed database, the objects
+        are grouped by the database routers return for them.
+        """
+        if self._db is None:
+            objs = list(objs)
+            by_db = {}
+            for obj in objs:
+                by_db.setdefault(self._db_for_object(obj), []).append(obj)
+            for db, group in by_db.items():
+                self.using(db).bulk_create(group, *args, **kwargs)
+            return objs
+        objs = super().bulk_create(objs, *args, **kwargs)
+        for field in self.model._meta.private_fields:
+            if isinstance(field, SqidsField) and field.store:
+                field.sync_stored_values(objs, using=self.db)
+        return objs
+
+    def for_sqid(self, sqid, field_name=None):
+        """
+        Return a queryset that database routers route by the given sqid.
+
+        See :class:`~django_sqids.routers.SqidsShardRouter`.
+        """
+        clone = self._chain()
+        clone._hints = {**self._hints, "sqid": sqid, "sqids_field_name": field_name}
+        return clone
+
+    def get_by_sqid(self, sqid, field_name=None):
+        """
+        Return the object with the given sqid.
+
+        Invalid sqids raise ``DoesNotExist`` without querying the database.
+        """
+        field = get_sqids_field(self.model, field_name)
+        value = field.decode(sqid)
+        if value is None:
+            raise self._does_not_exist()
+        return self.for_sqid(sqid, field_name).get(**field.get_real_filter(value))
+
+    async def aget_by_sqid(self, sqid, field_name=None):
+        field = get_sqids_field(self.model, field_name)
+        value = field.decode(sqid)
+        if value is None:
+            raise self._does_not_exist()
+        return await self.for_sqid(sqid, field_name).aget(
+            **field.get_real_filter(value)
+        )
+
+    def in_bulk_by_sqid(self, sqids, field_name=None):
+        """
+        Return a dictionary mapping each of the given sqids to its object.
+
+        All sqids are decoded before a single ``in_bulk`` query on the real
+        field, which is split into batches if the database limits the number
+        of query parameters. Invalid sqids and sqids without an object are
+        left out, the objects are not encoded again.
+
+        Unless the queryset uses a fixed database, the sqids are grouped by the
+        database routers return for them and each database is queried once.
+
+        :param sqids: The sqids to look up.
+        :param str field_name: Name of the SqidsField, if the model has more than one.
+
+        """
+        field = get_sqids_field(self.model, field_name)
+        decoded = _decode_sqids(field, sqids)
+        if not decoded:
+            return {}
+        return _by_sqid(decoded, self._in_bulk_decoded(field, decoded, field_name))
+
+    def _in_bulk_decoded(self, field, decoded, field_name):
+        objects = {}
+        for db, values in self._split_by_db(decoded, field_name).items():
+            qs = self.using(db)
+            if field.composite:
+                objects.update(
+                    (field.get_real_value(obj), obj)
+                    for obj in qs._filter_composite(field, values)
+                )
+            else:
+                objects.update(
+                    qs.in_bulk(list(values), field_name=field.real_field_name)
+                )
+        return objects
+
+    def get_cached_by_sqid(self, sqid, timeout=DEFAULT_TIMEOUT, field_name=None):
+        """
+        Return the object with the given sqid, from the cache if possible.
+
+        Objects are cached by model and real field value in the cache set by
+        ``DJANGO_SQIDS_OBJECT_CACHE``, and invalidated when they are saved
+        or deleted. Filtered querysets are not cached and always query the
+        database, as do querysets with deferred fields, annotations, related
+        objects or a fixed database.
+
+        :param str sqid: The sqid of the object.
+        :param timeout: The cache timeout, defaults to the timeout of the cache.
+        :param str field_name: Name of the SqidsField, if the model has more than one.
+
+        """
+        field = get_sqids_field(self.model, field_name)
+        value = field.decode(sqid)
+        if value is None:
+            raise self._does_not_exist()
+        if not self._is_cacheable():
+            return self.for_sqid(sqid, field_name).get(**field.get_real_filter(value))
+        cache = _get_object_cache()
+        key = _object_cache_key(field, value)
+        obj = cache.get(key)
+        if obj is None:
+            obj = self.for_sqid(sqid, field_name).get(**field.get_real_filter(value))
+            cache.set(key, obj, timeout)
+        return obj
+
+    async def aget_cached_by_sqid(self, sqid, timeout=DEFAULT_TIMEOUT, field_name=None):
+        """
+        Asynchronous version of :meth:`get_cached_by_sqid`.
+        """
+        field = get_sqids_field(self.model, field_name)
+        value = field.decode(sqid)
+        if value is None:
+            raise self._does_not_exist()
+        qs = self.for_sqid(sqid, field_name)
+        if not self._is_cacheable():
+            return await qs.aget(**field.get_real_filter(value))
+        cache = _get_object_cache()
+        key = _object_cache_key(field, value)
+        obj = await cache.aget(key)
+        if obj is None:
+            obj = await qs.aget(**field.get_real_filter(value))
+            await cache.aset(key, obj, timeout)
+        return obj
+
+    def get_many_cached_by_sqid(self, sqids, timeout=DEFAULT_TIMEOUT, field_name=None):
+        """
+        Return a dictionary mapping each of the given sqids to its object,
+        reading and filling the cache with one ``get_many`` and ``set_many``.
+
+        Objects missing from the cache are fetched like
+        :meth:`in_bulk_by_sqid`. Invalid sqids and sqids without an object
+        are left out.
+        """
+        field = get_sqids_field(self.model, field_name)
+        decoded = _decode_sqids(field, sqids)
+        if not decoded:
+            return {}
+        if not self._is_cacheable():
+            return _by_sqid(decoded, self._in_bulk_decoded(field, decoded, field_name))
+        cache = _get_object_cache()
+        keys = {_object_cache_key(field, value): value for value in decoded}
+        objects = {keys[key]: obj for key, obj in cache.get_many(keys).items()}
+        missing = {
+            value: sqids for value, sqids in decoded.items() if value not in objects
+        }
+        if missing:
+            fetched = self._in_bulk_decoded(field, missing, field_name)
+            cache.set_many(
+                {
+                    _object_cache_key(field, value): obj
+                    for value, obj in fetched.items()
+                },
+                timeout,
+            )
+            objects.update(fetched)
+        return _by_sqid(decoded, objects)
+
+    def _is_cacheable(self):
+        # only plain objects that any queryset of the model would return
+        query = self.query
+        return not (
+            query.has_filters()
+            or query.deferred_loading[0]
+            or query.annotations
+            or query.extra
+            or query.select_related
+            or self._prefetch_related_lookups
+            or self._db is not None
+        )
+
+    async def ain_bulk_by_sqid(self, sqids, field_name=None):
+        """
+        Asynchronous version of :meth:`in_bulk_by_sqid`.
+        """
+        field = get_sqids_field(self.model, field_name)
+        decoded = _decode_sqids(field, sqids)
+        if not decoded:
+            return {}
+        objects = {}
+        for db, values in self._split_by_db(decoded, field_name).items():
+            qs = self.using(db)
+            if field.composite:
+                async for obj in qs._filter_composite(field, values):
+                    objects[field.get_real_value(obj)] = obj
+            else:
+                objects.update(
+                    await qs.ain_bulk(list(values), field_name=field.real_field_name)
+                )
+        return _by_sqid(decoded, objects)
+
+    def _split_by_db(self, decoded, field_name):
+        if self._db is not None:
+            return {self._db: decoded}
+        groups = {}
+        for value, sqids in decoded.items():
+            hints = {**self._hints, "sqid": sqids[0], "sqids_field_name": field_name}
+            db = router.db_for_read(self.model, **hints)
+            groups.setdefault(db, {})[value] = sqids
+        return groups
+
+    def _filter_composite(self, field, decoded):
+        # in_bulk needs a single field, filter by one sqid of each value
+        sqids = [sqids[0] for sqids in decoded.values()]
+        return self.filter(**{"%s__in" % field.name: sqids})
+
+    def iter_sqids(self, field_name=None, chunk_size=2000, with_objects=False):
+        """
+        Yield the sqid of every row, encoding them in chunks.
+
+        Only the real field is fetched from the database, unless
+        ``with_objects`` is set and ``(sqid, object)`` pairs are yielded
+        instead. Each chunk of ``chunk_size`` rows is encoded in one pass, so
+        memory use stays flat even for very large tables.
+
+        :param str field_name: Name of the SqidsField, if the model has more than one.
+        :param int chunk_size: Number of rows fetched and encoded at once.
+        :param bool with_objects: Yield the objects along with their sqids.
+
+        """
+        field = get_sqids_field(self.model, field_name)
+        if with_objects:
+            for chunk in _chunks(self.iterator(chunk_size=chunk_size), chunk_size):
+                yield from zip(self._encode_objects(field, chunk), chunk)
+            return
+        values = self._real_values(field)
+        for chunk in _chunks(values.iterator(chunk_size=chunk_size), chunk_size):
+            yield from field.encode_many(chunk)
+
+    async def aiter_sqids(self, field_name=None, chunk_size=2000, with_objects=False):
+        """
+        Asynchronous version of :meth:`iter_sqids`.
+        """
+        field = get_sqids_field(self.model, field_name)
+        if with_objects:
+            rows = self.aiterator(chunk_size=chunk_size)
+            async for chunk in _achunks(rows, chunk_size):
+                for pair in zip(self._encode_objects(field, chunk), chunk):
+                    yield pair
+            return
+        values = self._real_values(field)
+        async for chunk in _achunks(
+            values.aiterator(chunk_size=chunk_size), chunk_size
+        ):
+            for sqid in field.encode_many(chunk):
+                yield sqid
+
+    def _real_values(self, field):
+        if field.composite:
+            return self.values_list(*field.real_field_name)
+        return self.values_list(field.real_field_name, flat=True)
+
+    def _encode_objects(self, field, objects):
+        return field.encode_many([field.get_real_value(obj) for obj in objects])
+
+
+class SqidsManager(models.Manager.from_queryset(SqidsQuerySet)):
+    pass
+
+
+def _connect_object_cache(sender, **kwargs):
+    # objects cached by get_cached_by_sqid are forgotten when they change.
+    # Only models that can be cached get receivers, a post_delete receiver
+    # disables the fast deletes of a model.
+    if sender._meta.abstract or not _get_cached_fields(sender):
+        return
+    post_save.connect(
+        _invalidate_cached_objects,
+        sender=sender,
+        dispatch_uid="django_sqids_object_cache",
+    )
+    post_delete.connect(
+        _invalidate_cached_objects,
+        sender=sender,
+        dispatch_uid="django_sqids_object_cache",
+    )
+
+
+class_prepared.connect(_connect_object_cache, dispatch_uid="django_sqids_object_cache")
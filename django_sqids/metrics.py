@@ -0,0 +1,117 @@
+"""
+Opt-in counters of the work done encoding and decoding sqids.
+
+Counters are kept per field, keyed by ``"app_label.Model.field"``. Process
+wide totals are available through :func:`snapshot`, and :func:`collect`
+gathers the counts of a single block of code, like a request.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.dispatch import Signal
+
+COUNTERS = (
+    "encode_calls",
+    "encode_time",
+    "decode_calls",
+    "decode_time",
+    "decode_failures_prefix",
+    "decode_failures_invalid",
+    "decode_failures_multiple",
+    "decode_legacy_hits",
+    "cache_hits",
+    "cache_misses",
+)
+
+# Sent by SqidsMetricsMiddleware with the `request` and the collected `metrics`
+metrics_collected = Signal()
+
+enabled = False
+
+
+class Metrics:
+    """
+    Thread safe counters of encode and decode calls per field.
+    """
+
+    def __init__(self):
+        self._data = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._lock = threading.Lock()
+
+    def add(self, key, counts):
+        with self._lock:
+            data = self._data[key]
+            for name, value in counts.items():
+                data[name] += value
+
+    def as_dict(self):
+        """
+        Return the counters of each field.
+        """
+        with self._lock:
+            return {key: dict(data) for key, data in self._data.items()}
+
+    def totals(self):
+        """
+        Return the counters summed over all fields.
+        """
+        totals = dict.fromkeys(COUNTERS, 0)
+        for data in self.as_dict().values():
+            for name, value in data.items():
+                totals[name] += value
+        return totals
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+_process_metrics = Metrics()
+_collectors = ContextVar("django_sqids_collectors", default=())
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def record(key, **counts):
+    """
+    Add to the counters of a field.
+    """
+    _process_metrics.add(key, counts)
+    for collector in _collectors.get():
+        collector.add(key, counts)
+
+
+def snapshot():
+    """
+    Return the counters of each field since the process started or the last reset.
+    """
+    return _process_metrics.as_dict()
+
+
+def reset():
+    _process_metrics.reset()
+
+
+@contextmanager
+def collect():
+    """
+    Collect the counters recorded in this block in a new :class:`Metrics`.
+
+    Blocks can be nested, counts are added to every active collector.
+    """
+    collector = Metrics()
+    token = _collectors.set((*_collectors.get(), collector))
+    try:
+        yield collector
+    finally:
+        _collectors.reset(token)
@@ -0,0 +1,43 @@
+import logging
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger("django_sqids")
+
+
+class SqidsMetricsMiddleware:
+    """
+    Collect the encode and decode metrics of each request.
+
+    The totals are logged at debug level, and sent with the
+    ``metrics_collected`` signal. If ``DJANGO_SQIDS_METRICS_HEADER`` is
+    enabled they are also added to the response in a header.
+    """
+
+    header = "X-Sqids-Metrics"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.enable()
+
+    def __call__(self, request):
+        with metrics.collect() as collected:
+            response = self.get_response(request)
+        totals = collected.totals()
+        summary = "encode=%d;decode=%d;failures=%d;time=%.3fms" % (
+            totals["encode_calls"],
+            totals["decode_calls"],
+            totals["decode_failures_prefix"]
+            + totals["decode_failures_invalid"]
+            + totals["decode_failures_multiple"],
+            (totals["encode_time"] + totals["decode_time"]) * 1000,
+        )
+        logger.debug("sqids metrics for %s: %s", request.path, summary)
+        metrics.metrics_collected.send(
+            sender=self.__class__, request=request, metrics=collected
+        )
+        if getattr(settings, "DJANGO_SQIDS_METRICS_HEADER", False):
+            response[self.header] = summary
+        return response
@@ -0,0 +1,67 @@
+import threading
+
+from sqids import Sqids
+from sqids.constants import DEFAULT_ALPHABET, DEFAULT_BLOCKLIST, DEFAULT_MIN_LENGTH
+
+from .codec import SqidsCodec
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def _get_shared(cls, alphabet, min_length, blocklist):
+    key = (
+        cls,
+        alphabet,
+        min_length,
+        None if blocklist is None else frozenset(blocklist),
+    )
+    try:
+        return _instances[key]
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _instances:
+            _instances[key] = cls(
+                alphabet=alphabet,
+                min_length=min_length,
+                blocklist=DEFAULT_BLOCKLIST if blocklist is None else blocklist,
+            )
+        return _instances[key]
+
+
+def get_sqids(alphabet=DEFAULT_ALPHABET, min_length=DEFAULT_MIN_LENGTH, blocklist=None):
+    """
+    Return the shared Sqids instance for a configuration.
+
+    Instances are created once per process and shared between all fields
+    using the same alphabet, min_length and blocklist. They must not be
+    modified.
+
+    :param str alphabet: The alphabet used to encode.
+    :param int min_length: The minimum length of generated sqids.
+    :param blocklist: Words that may not appear in sqids, defaults to the
+        blocklist of the sqids library.
+
+    """
+    # sqids uses a pre-filtered blocklist when given its own default objects
+    if alphabet == DEFAULT_ALPHABET:
+        alphabet = DEFAULT_ALPHABET
+    return _get_shared(Sqids, alphabet, min_length, blocklist)
+
+
+def get_codec(alphabet=DEFAULT_ALPHABET, min_length=DEFAULT_MIN_LENGTH, blocklist=None):
+    """
+    Return the shared :class:`~django_sqids.codec.SqidsCodec` for a configuration.
+
+    See :func:`get_sqids` for the arguments.
+    """
+    return _get_shared(SqidsCodec, alphabet, min_length, blocklist)
+
+
+def clear():
+    """
+    Forget all shared instances.
+    """
+    with _lock:
+        _instances.clear()
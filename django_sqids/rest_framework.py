@@ -0,0 +1,124 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import QuerySet
+from django.utils.translation import gettext_lazy as _
+from rest_framework.relations import (
+    MANY_RELATION_KWARGS,
+    ManyRelatedField,
+    RelatedField,
+)
+
+from .field import get_sqids_field
+
+
+class SqidsManyRelatedField(ManyRelatedField):
+    """
+    Resolve and encode a list of sqids at once instead of one by one.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        return self.child_relation.to_internal_value_many(data)
+
+    def to_representation(self, iterable):
+        return self.child_relation.to_representation_many(iterable)
+
+
+class SqidsPrimaryKeyRelatedField(RelatedField):
+    """
+    A related field represented by the sqids of the related objects.
+
+    The sqids are encoded and decoded with the ``SqidsField`` of the related
+    model. With ``many=True`` all sqids are resolved with a single query.
+
+    :param queryset: The related objects, required unless ``read_only``.
+    :param model: The related model, if there is no queryset.
+    :param str sqids_field_name: Name of the SqidsField, if the related model
+        has more than one.
+
+    """
+
+    default_error_messages = {
+        "required": _("This field is required."),
+        "does_not_exist": _('Invalid sqid "{sqid_value}" - object does not exist.'),
+        "incorrect_type": _(
+            "Incorrect type. Expected sqid string, received {data_type}."
+        ),
+    }
+
+    def __init__(self, model=None, sqids_field_name=None, **kwargs):
+        self.model = model
+        self.sqids_field_name = sqids_field_name
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SqidsManyRelatedField(**list_kwargs)
+
+    @property
+    def sqids_field(self):
+        model = self.model
+        if model is None:
+            model = self.get_queryset().model
+        return get_sqids_field(model, self.sqids_field_name)
+
+    def use_pk_only_optimization(self):
+        # the foreign key value can be encoded without loading the object
+        field = self.sqids_field
+        return not field.composite and field.real_col.primary_key
+
+    def to_representation(self, value):
+        field = self.sqids_field
+        if not field.composite and field.real_col.primary_key:
+            return field.encode(value.pk)
+        return field.encode(field.get_real_value(value))
+
+    def to_representation_many(self, iterable):
+        field = self.sqids_field
+        # fetch only the real fields, unless the objects are already loaded
+        if isinstance(iterable, QuerySet) and iterable._result_cache is None:
+            if field.composite:
+                values = list(iterable.values_list(*field.real_field_name))
+            else:
+                values = list(iterable.values_list(field.real_field_name, flat=True))
+        else:
+            values = [field.get_real_value(obj) for obj in iterable]
+        return field.encode_many(values)
+
+    def decode(self, data):
+        if not isinstance(data, str):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        value = self.sqids_field.decode(data)
+        if value is None:
+            self.fail("does_not_exist", sqid_value=data)
+        return value
+
+    def to_internal_value(self, data):
+        field = self.sqids_field
+        value = self.decode(data)
+        try:
+            return self.get_queryset().get(**field.get_real_filter(value))
+        except ObjectDoesNotExist:
+            self.fail("does_not_exist", sqid_value=data)
+
+    def to_internal_value_many(self, data):
+        field = self.sqids_field
+        values = [self.decode(sqid) for sqid in data]
+        if field.composite:
+            # in_bulk needs a single field, filter by the sqids
+            qs = self.get_queryset().filter(**{"%s__in" % field.name: data})
+            objects = {field.get_real_value(obj): obj for obj in qs}
+        else:
+            objects = self.get_queryset().in_bulk(
+                set(values), field_name=field.real_field_name
+            )
+        for sqid, value in zip(data, values):
+            if value not in objects:
+                self.fail("does_not_exist", sqid_value=sqid)
+        return [objects[value] for value in values]
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import router
+
+from .exceptions import ConfigError
+from .field import get_sqids_field
+
+
+class SqidsShardRouter:
+    """
+    Route sharded models to the database of the shard encoded in their sqids.
+
+    ``DJANGO_SQIDS_SHARDS`` maps model labels to the list of database aliases
+    of their shards. The shard number is the first value of a composite sqid,
+    e.g. ``SqidsField(real_field_name=("shard", "id"))``, which is known before
+    the object is saved. Every shard assigns its own ids, so sharded models
+    need a composite SqidsField.
+
+    Queries are routed by the ``sqid`` hint, see
+    :meth:`~django_sqids.managers.SqidsQuerySet.for_sqid`, and saved objects
+    by their ``instance`` hint. Models without shards are left to the other
+    routers.
+    """
+
+    def get_shards(self, model):
+        shards = getattr(settings, "DJANGO_SQIDS_SHARDS", None) or {}
+        return shards.get(model._meta.label)
+
+    def get_shard(self, model, sqid=None, instance=None, sqids_field_name=None):
+        """
+        Return the shard number of a sqid or an instance, or ``None``.
+        """
+        field = get_sqids_field(model, sqids_field_name)
+        if not field.composite:
+            raise ConfigError(
+                "%s needs a SqidsField with several real fields to be sharded, "
+                "the first one being the shard" % model._meta.label
+            )
+        if sqid is not None:
+            value = field.decode(sqid)
+        elif isinstance(instance, model):
+            value = (getattr(instance, field.real_field_name[0], None),)
+        else:
+            return None
+        if value is None or value[0] is None:
+            return None
+        return value[0]
+
+    def db_for_shard(self, model, **hints):
+        shards = self.get_shards(model)
+        if not shards:
+            return None
+        shard = self.get_shard(
+            model,
+            sqid=hints.get("sqid"),
+            instance=hints.get("instance"),
+            sqids_field_name=hints.get("sqids_field_name"),
+        )
+        if shard is None:
+            return None
+        return shards[shard % len(shards)]
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_shard(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_shard(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self.get_shards(type(obj1)) or self.get_shards(type(obj2)):
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        model = hints.get("model")
+        if model is None:
+            return None
+        shards = self.get_shards(model)
+        if not shards:
+            return None
+        return db in shards
+
+
+def split_by_db(model, sqids, field_name=None):
+    """
+    Group sqids by the database their objects are read from.
+
+    :param model: The model of the sqids.
+    :param sqids: The sqids to group.
+    :param str field_name: Name of the SqidsField, if the model has more than one.
+
+    """
+    groups = {}
+    for sqid in sqids:
+        db = router.db_for_read(model, sqid=sqid, sqids_field_name=field_name)
+        groups.setdefault(db, []).append(sqid)
+    return groups
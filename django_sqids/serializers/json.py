@@ -0,0 +1,250 @@
+"""
+Serialize data to/from JSON, with the sqids of the objects.
+
+Add the format to your settings to use it with ``dumpdata`` and ``loaddata``::
+
+    SERIALIZATION_MODULES = {"sqids_json": "django_sqids.serializers.json"}
+
+"""
+
+import json
+from functools import lru_cache
+from itertools import islice
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.json import Serializer as JSONSerializer
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db.models import IntegerField
+
+from ..field import SqidsField
+
+
+@lru_cache(maxsize=None)
+def _get_sqids_fields(model):
+    return tuple(
+        field for field in model._meta.private_fields if isinstance(field, SqidsField)
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_key_field(model):
+    # the SqidsField that can replace the primary key of the model
+    for field in _get_sqids_fields(model):
+        if (
+            not field.composite
+            and field.real_col.primary_key
+            and isinstance(field.real_col, IntegerField)
+        ):
+            return field
+    return None
+
+
+def _get_reference_key_field(field):
+    # the SqidsField of the primary key a reference points to
+    related_model = field.remote_field.model
+    # references to other fields than the primary key are kept
+    if not field.many_to_many and field.target_field != related_model._meta.pk:
+        return None
+    return _get_key_field(related_model)
+
+
+class Serializer(JSONSerializer):
+    """
+    Convert a queryset to JSON, including the sqids of the objects.
+
+    The sqids of every SqidsField are added to the fields of the objects.
+    With ``sqid_keys=True``, primary keys and references to models with a
+    SqidsField of their primary key are written as sqids instead.
+
+    Objects are encoded in chunks of ``chunk_size``, each SqidsField encodes
+    all values of a chunk at once.
+    """
+
+    chunk_size = 2000
+
+    def serialize(self, queryset, *, sqid_keys=False, **options):
+        self.sqid_keys = sqid_keys
+        self._references = {}
+        return super().serialize(self._encode_in_chunks(queryset), **options)
+
+    def _encode_in_chunks(self, objects):
+        iterator = iter(objects)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            self._encode_chunk(chunk)
+            yield from chunk
+
+    def _encode_chunk(self, chunk):
+        by_model = {}
+        for obj in chunk:
+            by_model.setdefault(type(obj), []).append(obj)
+        self._references = {}
+        for model, objects in by_model.items():
+            for field in _get_sqids_fields(model):
+                values = [field.get_real_value(obj) for obj in objects]
+                # remember the sqids on the objects, like reading the field does
+                for obj, value, sqid in zip(objects, values, field.encode_many(values)):
+                    if value is not None:
+                        obj.__dict__[field.cache_attname] = (value, sqid)
+            if self.sqid_keys:
+                for field in model._meta.concrete_fields:
+                    key_field = self._get_reference_key_field(field)
+                    if key_field is not None:
+                        self._encode_references(key_field, objects, field.attname)
+
+    def _encode_references(self, key_field, objects, attname):
+        references = self._references.setdefault(key_field, {})
+        values = {getattr(obj, attname) for obj in objects} - {None}
+        values.difference_update(references)
+        references.update(zip(values, key_field.encode_many(list(values))))
+
+    def _get_reference_key_field(self, field):
+        if not field.remote_field:
+            return None
+        related_model = field.remote_field.model
+        if self.use_natural_foreign_keys and hasattr(related_model, "natural_key"):
+            return None
+        return _get_reference_key_field(field)
+
+    def handle_fk_field(self, obj, field):
+        key_field = self.sqid_keys and self._get_reference_key_field(field)
+        if not key_field:
+            return super().handle_fk_field(obj, field)
+        value = getattr(obj, field.attname)
+        if value is not None:
+            value = self._references[key_field][value]
+        self._current[field.name] = value
+
+    def handle_m2m_field(self, obj, field):
+        key_field = self.sqid_keys and self._get_reference_key_field(field)
+        if not key_field or not field.remote_field.through._meta.auto_created:
+            return super().handle_m2m_field(obj, field)
+        prefetched = getattr(obj, "_prefetched_objects_cache", {}).get(field.name)
+        if prefetched is not None:
+            values = [related.pk for related in prefetched]
+        else:
+            values = list(getattr(obj, field.name).values_list("pk", flat=True))
+        self._current[field.name] = key_field.encode_many(values)
+
+    def get_dump_object(self, obj):
+        data = super().get_dump_object(obj)
+        for field in _get_sqids_fields(type(obj)):
+            data["fields"][field.name] = getattr(obj, field.name)
+        key_field = self.sqid_keys and _get_key_field(type(obj))
+        if key_field and data.get("pk") is not None:
+            data["pk"] = getattr(obj, key_field.name)
+        return data
+
+
+class _SqidsDecoder:
+    """
+    Decode each distinct sqid of a set of objects once.
+    """
+
+    def __init__(self):
+        self.sqids = {}
+        self.decoded = {}
+
+    def collect(self, key_field, values):
+        if key_field is not None:
+            sqids = self.sqids.setdefault(key_field, set())
+            sqids.update(value for value in values if isinstance(value, str))
+
+    def decode_all(self):
+        for key_field, sqids in self.sqids.items():
+            for sqid in sqids:
+                value = key_field.decode(sqid)
+                if value is None:
+                    raise DeserializationError(
+                        "Invalid sqid %r for %s"
+                        % (sqid, key_field.attached_to_model._meta.label)
+                    )
+                self.decoded[key_field, sqid] = value
+
+    def decode(self, key_field, value):
+        if isinstance(value, str):
+            return self.decoded[key_field, value]
+        return value
+
+
+def _get_model(data):
+    try:
+        return apps.get_model(data["model"])
+    except (KeyError, LookupError, TypeError, ValueError):
+        # left to the python deserializer to report
+        return None
+
+
+def _get_references(model, fields):
+    # fields referencing models whose primary key has a SqidsField
+    for name in fields:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and field.remote_field:
+            key_field = _get_reference_key_field(field)
+            if key_field is not None:
+                yield name, key_field, field.many_to_many
+
+
+def _decode_sqids(objects):
+    """
+    Replace the sqids of primary keys and references by the values they
+    encode, decoding each distinct sqid once.
+    """
+    decoder = _SqidsDecoder()
+    pending = []
+    for data in objects:
+        model = _get_model(data)
+        if model is None:
+            continue
+        fields = data.get("fields", {})
+        # the sqids are computed from the other fields
+        for field in _get_sqids_fields(model):
+            fields.pop(field.name, None)
+        key_field = _get_key_field(model)
+        references = list(_get_references(model, fields))
+        decoder.collect(key_field, [data.get("pk")])
+        for name, reference_key_field, many in references:
+            value = fields[name]
+            decoder.collect(reference_key_field, value if many else [value])
+        pending.append((data, key_field, references))
+
+    decoder.decode_all()
+    for data, key_field, references in pending:
+        if key_field is not None and "pk" in data:
+            data["pk"] = decoder.decode(key_field, data["pk"])
+        fields = data.get("fields", {})
+        for name, reference_key_field, many in references:
+            value = fields[name]
+            if many:
+                value = [decoder.decode(reference_key_field, item) for item in value]
+            else:
+                value = decoder.decode(reference_key_field, value)
+            fields[name] = value
+    return objects
+
+
+def Deserializer(stream_or_string, **options):
+    """
+    Deserialize a stream or string of JSON data, decoding sqids in bulk.
+
+    Primary keys and references can be given as sqids, which are decoded
+    without querying the database.
+    """
+    if not isinstance(stream_or_string, (bytes, str)):
+        stream_or_string = stream_or_string.read()
+    if isinstance(stream_or_string, bytes):
+        stream_or_string = stream_or_string.decode()
+    try:
+        objects = _decode_sqids(json.loads(stream_or_string))
+    except DeserializationError:
+        raise
+    except Exception as exc:
+        raise DeserializationError() from exc
+    yield from PythonDeserializer(objects, **options)
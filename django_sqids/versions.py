@@ -0,0 +1,68 @@
+import re
+import threading
+
+from django.conf import settings
+from sqids.constants import DEFAULT_ALPHABET, DEFAULT_MIN_LENGTH
+
+from .registry import get_codec
+
+
+def resolve_config(alphabet=None, min_length=None, blocklist=None):
+    """
+    Fill in the alphabet and min_length from the settings or the defaults.
+
+    A blocklist of ``None`` is the blocklist of the sqids library.
+    """
+    if min_length is None:
+        min_length = (
+            getattr(settings, "DJANGO_SQIDS_MIN_LENGTH", None) or DEFAULT_MIN_LENGTH
+        )
+    if alphabet is None:
+        alphabet = getattr(settings, "DJANGO_SQIDS_ALPHABET", None) or DEFAULT_ALPHABET
+    return {"alphabet": alphabet, "min_length": min_length, "blocklist": blocklist}
+
+
+class SqidsVersion:
+    """
+    A previous configuration of a SqidsField whose sqids can still be decoded.
+
+    The prefix identifies the version of a sqid, so it must be different
+    for every version of a field.
+
+    :param str prefix: The prefix of the sqids of this version.
+    :param str alphabet: The alphabet of this version.
+    :param int min_length: The minimum length of this version.
+
+    """
+
+    def __init__(self, prefix, alphabet=None, min_length=None):
+        self.prefix = prefix
+        self.alphabet = alphabet
+        self.min_length = min_length
+        self.hits = 0
+        self._codec = None
+        self._regex = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<%s: %r>" % (self.__class__.__name__, self.prefix)
+
+    @property
+    def codec(self):
+        if self._codec is None:
+            self._codec = get_codec(**resolve_config(self.alphabet, self.min_length))
+        return self._codec
+
+    @property
+    def pattern(self):
+        return re.escape(self.prefix) + self.codec.pattern
+
+    @property
+    def regex(self):
+        if self._regex is None:
+            self._regex = re.compile(self.pattern)
+        return self._regex
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
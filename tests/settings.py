@@ -7,6 +7,7 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.auth",
     "django.contrib.admin",
+    "django_sqids",
     "tests.test_app",
 ]
 MIDDLEWARE = [
@@ -19,8 +20,15 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
-    }
+    },
+    "shard1": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
 }
+DATABASE_ROUTERS = ["django_sqids.routers.SqidsShardRouter"]
+DJANGO_SQIDS_SHARDS = {"test_app.TestShardedModel": ["default", "shard1"]}
+SERIALIZATION_MODULES = {"sqids_json": "django_sqids.serializers.json"}
 if os.environ.get("TEST_WITH_PG"):
     DATABASES = {
         "default": {
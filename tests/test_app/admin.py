@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import TestModelWithDifferentConfig
+from django_sqids.admin import SqidsSearchMixin
+
+from .models import TestModelWithDifferentConfig, TestUser, TestUserWithPrefix
 
 
 @admin.register(TestModelWithDifferentConfig)
@@ -8,3 +10,14 @@ class TestModelAdmin(admin.ModelAdmin):
     list_display = ("sqid",)
     list_display_links = ()
     search_fields = ("sqid__exact",)
+
+
+@admin.register(TestUserWithPrefix)
+class TestUserWithPrefixAdmin(SqidsSearchMixin, admin.ModelAdmin):
+    list_display = ("sqid", "username")
+    search_fields = ("username", "email")
+
+
+@admin.register(TestUser)
+class TestUserAdmin(SqidsSearchMixin, admin.ModelAdmin):
+    search_fields = ("username", "last_name")
@@ -3,21 +3,46 @@ from django.db import models
 from django.db.models import Model
 from sqids import Sqids
 
-from django_sqids import SqidsField
+from django_sqids import SqidsField, SqidsManager, SqidsVersion, shuffle_alphabet
 
 
 class TestModel(Model):
     sqid = SqidsField(real_field_name="id")
 
+    objects = SqidsManager()
+
 
 class TestModelWithPrefix(Model):
     sqid = SqidsField(real_field_name="id", prefix="P-")
 
+    objects = SqidsManager()
+
 
 class TestModelWithDifferentConfig(Model):
     sqid = SqidsField(min_length=5, alphabet="OPQRST1234567890")
 
 
+class TestModelWithCache(Model):
+    sqid = SqidsField(cache_size=2)
+
+
+class TestModelWithStoredSqid(Model):
+    sqid = SqidsField(prefix="S-", store=True, db_index=True)
+
+    objects = SqidsManager()
+
+
+class TestModelWithVersions(Model):
+    sqid = SqidsField(
+        prefix="v2-",
+        alphabet=shuffle_alphabet(2),
+        legacy_versions=[
+            SqidsVersion("v1-", alphabet=shuffle_alphabet(1)),
+            SqidsVersion(""),
+        ],
+    )
+
+
 this_sqids_instance = Sqids()
 
 
@@ -41,14 +66,52 @@ class TestUserRelated(Model):
     )
 
 
+class TestUserRelatedByUsername(Model):
+    user = models.ForeignKey(
+        "TestUser",
+        to_field="username",
+        related_name="related_by_username",
+        on_delete=models.CASCADE,
+    )
+
+
 class TestUserRelatedWithPrefix(Model):
     sqid = SqidsField(real_field_name="id", prefix="R-")
+    user_sqid = SqidsField(real_field_name="user_id", codec_from="user")
 
     user = models.ForeignKey(
         "TestUserWithPrefix", related_name="related", on_delete=models.CASCADE
     )
 
 
+class TestTeam(Model):
+    sqid = SqidsField(prefix="T-")
+
+    members = models.ManyToManyField("TestUser", related_name="teams")
+
+
+class TestTenantModel(Model):
+    tenant_id = models.IntegerField()
+    sqid = SqidsField(real_field_name=("tenant_id", "id"), prefix="C-")
+
+    objects = SqidsManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["tenant_id", "id"])]
+
+
+class TestTenantModelWithStoredSqid(Model):
+    tenant_id = models.IntegerField()
+    sqid = SqidsField(real_field_name=("tenant_id", "id"), prefix="CS-", store=True)
+
+
+class TestShardedModel(Model):
+    shard = models.IntegerField()
+    sqid = SqidsField(real_field_name=("shard", "id"), prefix="X-")
+
+    objects = SqidsManager()
+
+
 class FirstSubClass(TestModel):
     pass
 
@@ -1,6 +1,6 @@
 from django.shortcuts import get_object_or_404, render
 
-from .models import TestModel, TestModelWithPrefix
+from .models import TestModel, TestModelWithOwnInstance, TestModelWithPrefix
 
 
 def test_model_view(request, sqid):
@@ -13,3 +13,15 @@ def test_model_with_prefix_view(request, sqid):
     return render(
         request, "test_app/testmodel.html", {"object": test_model_with_prefix}
     )
+
+
+def test_model_with_prefix_pk_view(request, pk):
+    test_model_with_prefix = get_object_or_404(TestModelWithPrefix, pk=pk)
+    return render(
+        request, "test_app/testmodel.html", {"object": test_model_with_prefix}
+    )
+
+
+def test_model_with_own_instance_pk_view(request, pk):
+    test_model = get_object_or_404(TestModelWithOwnInstance, pk=pk)
+    return render(request, "test_app/testmodel.html", {"object": test_model})
@@ -561,3 +561,1617 @@ def test_lookup_django_admin_by_sqid(admin_client):
             assert search in html_content, f"Expected {search_instance.sqid} to be IN the response content"
         else:
             assert search not in html_content, f"Expected {search_instance.sqid} to NOT be in the response content"
+
+
+def test_cache_is_disabled_by_default():
+    from tests.test_app.models import TestModel
+
+    assert TestModel.sqid.cache_info() is None
+
+
+def test_cache_hits_and_misses():
+    from tests.test_app.models import TestModelWithCache
+
+    field = TestModelWithCache.sqid
+    field.cache_clear()
+    instance = TestModelWithCache.objects.create()
+
+    assert field.encode(instance.pk) == instance.sqid
+    info = field.cache_info()["encode"]
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (1, 1, 2, 1)
+
+    assert TestModelWithCache.objects.get(sqid=instance.sqid) == instance
+    assert TestModelWithCache.objects.get(sqid=instance.sqid) == instance
+    info = field.cache_info()["decode"]
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_cache_remembers_invalid_sqids():
+    from tests.test_app.models import TestModelWithCache
+
+    field = TestModelWithCache.sqid
+    field.cache_clear()
+    assert field.decode("!!!") is None
+    assert field.decode("!!!") is None
+    assert field.cache_info()["decode"].hits == 1
+
+
+def test_cache_evicts_least_recently_used():
+    from tests.test_app.models import TestModelWithCache
+
+    field = TestModelWithCache.sqid
+    field.cache_clear()
+    field.encode(1)
+    field.encode(2)
+    field.encode(1)
+    field.encode(3)
+    assert list(field.encode_cache._data) == [1, 3]
+    assert field.cache_info()["encode"].currsize == 2
+
+
+@override_settings(DJANGO_SQIDS_CACHE_SIZE=10)
+def test_cache_size_from_settings():
+    from django_sqids.cache import LRUCache
+    from tests.test_app.models import TestModel
+
+    cache = TestModel.sqid.get_cache()
+    assert isinstance(cache, LRUCache)
+    assert cache.maxsize == 10
+
+
+def test_cache_is_thread_safe():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django_sqids.cache import LRUCache
+
+    cache = LRUCache(maxsize=50)
+
+    def work(offset):
+        for i in range(1000):
+            key = (offset + i) % 100
+            if cache.get(key) is LRUCache.MISSING:
+                cache.set(key, str(key))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+
+    info = cache.info()
+    assert info.currsize == 50
+    assert info.hits + info.misses == 8000
+
+
+def test_sqid_is_memoized_on_instance():
+    from unittest import mock
+
+    from tests.test_app.models import TestModel
+
+    instance = TestModel.objects.create()
+    sqid = instance.sqid
+    with mock.patch.object(TestModel.sqid, "encode") as encode:
+        assert instance.sqid == sqid
+        assert instance.sqid == sqid
+    encode.assert_not_called()
+
+    instance.id += 1
+    assert instance.sqid != sqid
+    assert TestModel.sqid.decode(instance.sqid) == instance.id
+
+
+def test_memoized_sqid_survives_pickling():
+    import pickle
+
+    from tests.test_app.models import TestModel
+
+    instance = TestModel.objects.create()
+    sqid = instance.sqid
+    restored = pickle.loads(pickle.dumps(instance))
+    assert restored.sqid == sqid
+    restored.id = 3
+    assert TestModel.sqid.decode(restored.sqid) == 3
+
+
+def test_encode_many():
+    from tests.test_app.models import TestModelWithPrefix
+
+    field = TestModelWithPrefix.sqid
+    assert field.encode_many([1, 2, 1, None]) == [
+        field.encode(1),
+        field.encode(2),
+        field.encode(1),
+        None,
+    ]
+
+
+def test_iter_sqids():
+    from tests.test_app.models import TestModelWithPrefix
+
+    instances = [TestModelWithPrefix.objects.create() for _ in range(5)]
+    qs = TestModelWithPrefix.objects.order_by("id")
+
+    assert list(qs.iter_sqids(chunk_size=2)) == [i.sqid for i in instances]
+    assert list(qs.iter_sqids(chunk_size=2)) == list(qs.values_list("sqid", flat=True))
+    assert list(qs.filter(id__gt=instances[2].id).iter_sqids()) == [
+        instances[3].sqid,
+        instances[4].sqid,
+    ]
+    assert list(qs.none().iter_sqids()) == []
+
+
+def test_get_sqids_field():
+    from django.core.exceptions import FieldDoesNotExist
+
+    from django_sqids import get_sqids_field
+    from tests.test_app.models import SecondSubClass, TestModel
+
+    assert get_sqids_field(TestModel) is TestModel.sqid
+    assert get_sqids_field(TestModel, "sqid") is TestModel.sqid
+    assert get_sqids_field(SecondSubClass) is SecondSubClass.sqid
+    with pytest.raises(FieldDoesNotExist):
+        get_sqids_field(TestModel, "other")
+
+
+def test_fields_share_sqids_instances():
+    from tests.test_app.models import TestUser, TestUserRelated
+
+    assert TestUser.sqid.get_sqid_instance() is TestUserRelated.sqid.get_sqid_instance()
+
+
+def test_registry_keys_on_configuration():
+    from django_sqids.registry import get_sqids
+
+    assert get_sqids() is get_sqids()
+    assert get_sqids(min_length=5) is get_sqids(min_length=5)
+    assert get_sqids(min_length=5) is not get_sqids()
+    assert get_sqids(alphabet="abc123") is not get_sqids()
+    assert get_sqids(blocklist=["a1b", "c2d"]) is get_sqids(blocklist=["c2d", "a1b"])
+    assert get_sqids(blocklist=[]) is not get_sqids()
+    assert get_sqids(blocklist=[]).encode([1]) == Sqids(blocklist=[]).encode([1])
+
+
+def test_sqids_instance_is_built_lazily():
+    from unittest import mock
+
+    from django.db.models import Model
+
+    from django_sqids import SqidsField
+
+    with mock.patch.object(SqidsField, "get_codec") as get_codec:
+
+        class LazyModel(Model):
+            class Meta:
+                app_label = "tests.test_app"
+
+            sqid = SqidsField(min_length=7)
+
+        get_codec.assert_not_called()
+
+    assert LazyModel.sqid._codec is None
+    assert len(LazyModel.sqid.encode(1)) == 7
+    assert LazyModel.sqid._codec is not None
+
+
+def test_deepcopy_drops_sqids_instance_and_caches():
+    import copy
+
+    from tests.test_app.models import TestModelWithCache
+
+    field = TestModelWithCache.sqid
+    field.encode(1)
+    clone = copy.deepcopy(field)
+    assert clone._sqids_instance is None
+    assert clone._codec is None
+    assert clone.attached_to_model is None
+    assert "encode_cache" not in clone.__dict__
+    assert "decode_cache" not in clone.__dict__
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {},
+        {"min_length": 10},
+        {"min_length": 100},
+        {"alphabet": "OPQRST1234567890", "min_length": 5},
+        {"alphabet": "abc"},
+        {"alphabet": shuffle_alphabet("seed"), "blocklist": []},
+    ],
+)
+def test_codec_matches_reference_implementation(config):
+    import string
+    import sys
+
+    from django_sqids.codec import SqidsCodec
+
+    rng = random.Random(0)
+    reference = Sqids(**config)
+    codec = SqidsCodec(**config)
+    numbers = [*range(1000), *(rng.randrange(sys.maxsize) for _ in range(1000))]
+    for number in [*numbers, sys.maxsize]:
+        sqid = reference.encode([number])
+        assert codec.encode(number) == sqid
+        assert codec.decode(sqid) == number
+
+    alphabet = config.get("alphabet", string.ascii_letters + string.digits)
+    for _ in range(5000):
+        sqid = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        decoded = reference.decode(sqid)
+        assert codec.decode(sqid) == (decoded[0] if len(decoded) == 1 else None)
+    assert codec.decode("invalid-sqid!") is None
+
+
+def test_codec_matches_reference_implementation_with_blocklist():
+    from django_sqids.codec import SqidsCodec
+
+    for alphabet in ("abcdefghijklmnopqrstuvwxyz0123456789", "abc"):
+        unblocked = Sqids(alphabet=alphabet, blocklist=[])
+        for number in range(100):
+            # block the sqid itself to force re-encoding
+            blocklist = [unblocked.encode([number]).upper(), "ab1c", "xyz"]
+            reference = Sqids(alphabet=alphabet, blocklist=blocklist)
+            codec = SqidsCodec(alphabet=alphabet, blocklist=blocklist)
+            sqid = reference.encode([number])
+            assert codec.encode(number) == sqid
+            assert codec.decode(sqid) == number
+
+
+def test_codec_rejects_invalid_input():
+    from django_sqids.codec import SqidsCodec
+
+    with pytest.raises(ValueError):
+        SqidsCodec(alphabet="ab")
+    with pytest.raises(ValueError):
+        SqidsCodec(alphabet="aab")
+    with pytest.raises(ValueError):
+        SqidsCodec(min_length=256)
+    with pytest.raises(ValueError):
+        SqidsCodec().encode(-1)
+
+
+def test_field_uses_shared_codec():
+    from django_sqids.codec import SqidsAdapter, SqidsCodec
+    from tests.test_app.models import (
+        TestModelWithDifferentConfig,
+        TestModelWithOwnInstance,
+        TestUser,
+        TestUserRelated,
+    )
+
+    assert isinstance(TestUser.sqid.codec, SqidsCodec)
+    assert TestUser.sqid.codec is TestUserRelated.sqid.codec
+    assert TestModelWithDifferentConfig.sqid.codec.min_length == 5
+    assert isinstance(TestModelWithOwnInstance.sqid.codec, SqidsAdapter)
+
+
+def test_is_valid_sqid():
+    from tests.test_app.models import (
+        TestModelWithDifferentConfig,
+        TestModelWithOwnInstance,
+        TestModelWithPrefix,
+    )
+
+    field = TestModelWithPrefix.sqid
+    assert field.is_valid_sqid(field.encode(1))
+    assert field.is_valid_sqid(field.encode(2**63 - 1))
+    assert not field.is_valid_sqid(field.encode(1)[2:])
+    assert not field.is_valid_sqid("P-")
+    assert not field.is_valid_sqid("P-a")
+    assert not field.is_valid_sqid("P-abc!")
+    assert not field.is_valid_sqid("P-" + "a" * 100)
+    assert not field.is_valid_sqid(None)
+    assert not field.is_valid_sqid(1)
+
+    field = TestModelWithDifferentConfig.sqid
+    assert field.is_valid_sqid(field.encode(1))
+    assert not field.is_valid_sqid(field.encode(1)[:4])
+    assert not field.is_valid_sqid(field.encode(1).lower())
+
+    field = TestModelWithOwnInstance.sqid
+    assert field.is_valid_sqid(field.encode(1))
+    assert not field.is_valid_sqid("")
+
+
+def test_invalid_sqids_are_not_decoded():
+    from unittest import mock
+
+    from tests.test_app.models import TestModelWithDifferentConfig
+
+    field = TestModelWithDifferentConfig.sqid
+    with mock.patch.object(field.codec, "decode") as decode:
+        for value in ("", "abc", "OPQ", "OPQRST1234567890" * 2):
+            assert field.get_prep_value(value) is None
+    decode.assert_not_called()
+
+
+def test_invalid_exact_lookup_does_not_query(django_assert_num_queries):
+    from tests.test_app.models import TestModel, TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    with django_assert_num_queries(0):
+        assert list(TestModel.objects.filter(sqid="invalid!")) == []
+        assert TestModel.objects.filter(sqid__gt="invalid!").count() == 0
+        assert not TestModelWithPrefix.objects.filter(sqid=instance.sqid[2:]).exists()
+        with pytest.raises(TestModelWithPrefix.DoesNotExist):
+            TestModelWithPrefix.objects.get(sqid="X-" + instance.sqid[2:])
+
+    with django_assert_num_queries(1):
+        assert list(TestModelWithPrefix.objects.exclude(sqid="invalid!")) == [instance]
+    with django_assert_num_queries(1):
+        assert list(
+            TestModelWithPrefix.objects.filter(sqid="invalid!")
+            | TestModelWithPrefix.objects.filter(sqid=instance.sqid)
+        ) == [instance]
+
+
+def test_invalid_in_lookup_does_not_query(django_assert_num_queries):
+    from tests.test_app.models import TestModel
+
+    instance = TestModel.objects.create()
+    with django_assert_num_queries(0):
+        assert list(TestModel.objects.filter(sqid__in=["invalid!", "!"])) == []
+        assert list(TestModel.objects.filter(sqid__in=[])) == []
+
+
+def test_in_lookup_drops_invalid_and_duplicate_sqids(django_assert_num_queries):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from tests.test_app.models import TestModel
+
+    instance = TestModel.objects.create()
+    sqids = [instance.sqid, "invalid!", instance.sqid, "!"]
+    with CaptureQueriesContext(connection) as context:
+        assert list(TestModel.objects.filter(sqid__in=sqids)) == [instance]
+    assert len(context.captured_queries) == 1
+    assert "IN (%d)" % instance.pk in context.captured_queries[0]["sql"]
+
+
+def test_none_lookup_still_uses_isnull():
+    from tests.test_app.models import TestUser, TestUserRelated
+
+    user = TestUser.objects.create(username="a")
+    other = TestUser.objects.create(username="b")
+    TestUserRelated.objects.create(user=other)
+    assert list(TestUser.objects.filter(related__sqid=None)) == [user]
+
+
+@pytest.fixture
+def sqids_metrics():
+    from django_sqids import metrics
+
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_metrics_are_disabled_by_default():
+    from django_sqids import metrics
+    from tests.test_app.models import TestModel
+
+    metrics.reset()
+    TestModel.sqid.encode(1)
+    assert metrics.snapshot() == {}
+
+
+def test_metrics_count_encode_and_decode(sqids_metrics):
+    from tests.test_app.models import TestModelWithCache, TestModelWithPrefix
+
+    field = TestModelWithPrefix.sqid
+    sqid = field.encode(1)
+    field.encode_many([1, 2, 2])
+    assert field.decode(sqid) == 1
+    assert field.decode("X-" + sqid[2:]) is None
+    assert field.decode("P-!") is None
+    assert field.decode("P-" + "a" * 100) is None
+    assert field.decode("P-" + Sqids().encode([1, 2])) is None
+
+    counts = sqids_metrics.snapshot()["test_app.TestModelWithPrefix.sqid"]
+    assert counts["encode_calls"] == 3
+    assert counts["decode_calls"] == 5
+    assert counts["encode_time"] > 0
+    assert counts["decode_time"] > 0
+    assert counts["decode_failures_prefix"] == 1
+    assert counts["decode_failures_invalid"] == 2
+    assert counts["decode_failures_multiple"] == 1
+    assert counts["cache_hits"] == counts["cache_misses"] == 0
+
+    field = TestModelWithCache.sqid
+    field.cache_clear()
+    field.encode(1)
+    field.encode(1)
+    counts = sqids_metrics.snapshot()["test_app.TestModelWithCache.sqid"]
+    assert (counts["cache_hits"], counts["cache_misses"]) == (1, 1)
+
+
+def test_metrics_collect(sqids_metrics):
+    from tests.test_app.models import TestModel
+
+    TestModel.sqid.encode(1)
+    with sqids_metrics.collect() as outer:
+        TestModel.sqid.encode(1)
+        with sqids_metrics.collect() as inner:
+            TestModel.sqid.decode("!")
+    assert outer.totals()["encode_calls"] == 1
+    assert outer.totals()["decode_calls"] == 1
+    assert inner.totals()["encode_calls"] == 0
+    assert inner.as_dict()["test_app.TestModel.sqid"]["decode_calls"] == 1
+    assert sqids_metrics.snapshot()["test_app.TestModel.sqid"]["encode_calls"] == 2
+
+
+@override_settings(
+    MIDDLEWARE=["django_sqids.middleware.SqidsMetricsMiddleware"],
+    DJANGO_SQIDS_METRICS_HEADER=True,
+)
+def test_metrics_middleware(client, sqids_metrics):
+    from django_sqids.metrics import metrics_collected
+    from tests.test_app.models import TestModel
+
+    instance = TestModel.objects.create()
+    received = []
+
+    def receiver(sender, request, metrics, **kwargs):
+        received.append(metrics.totals())
+
+    metrics_collected.connect(receiver)
+    try:
+        response = client.get(reverse("without-prefix", kwargs={"sqid": instance.sqid}))
+    finally:
+        metrics_collected.disconnect(receiver)
+
+    assert response.status_code == 200
+    assert response["X-Sqids-Metrics"].startswith("encode=0;decode=1;failures=0;")
+    assert received[0]["decode_calls"] == 1
+
+
+def test_get_by_sqid(django_assert_num_queries):
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    assert TestModelWithPrefix.objects.get_by_sqid(instance.sqid) == instance
+    with django_assert_num_queries(0):
+        with pytest.raises(TestModelWithPrefix.DoesNotExist):
+            TestModelWithPrefix.objects.get_by_sqid(instance.sqid[2:])
+
+
+def test_aget_by_sqid(django_assert_num_queries):
+    from asgiref.sync import async_to_sync
+
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    get_by_sqid = async_to_sync(TestModelWithPrefix.objects.all().aget_by_sqid)
+    assert get_by_sqid(instance.sqid) == instance
+    with django_assert_num_queries(0):
+        with pytest.raises(TestModelWithPrefix.DoesNotExist):
+            get_by_sqid("P-invalid!")
+    instance.delete()
+    with pytest.raises(TestModelWithPrefix.DoesNotExist):
+        get_by_sqid(instance.sqid)
+
+
+def test_ain_bulk_by_sqid(django_assert_num_queries):
+    from asgiref.sync import async_to_sync
+
+    from tests.test_app.models import TestModel
+
+    first, second = TestModel.objects.create(), TestModel.objects.create()
+    missing = TestModel.sqid.encode(second.pk + 100)
+    in_bulk_by_sqid = async_to_sync(TestModel.objects.all().ain_bulk_by_sqid)
+
+    with django_assert_num_queries(1):
+        result = in_bulk_by_sqid([first.sqid, second.sqid, first.sqid, missing, "!"])
+    assert result == {first.sqid: first, second.sqid: second}
+    with django_assert_num_queries(0):
+        assert in_bulk_by_sqid(["!", ""]) == {}
+
+
+def test_iter_sqids_with_objects():
+    from tests.test_app.models import TestModel
+
+    instances = [TestModel.objects.create() for _ in range(5)]
+    qs = TestModel.objects.order_by("id")
+    pairs = list(qs.iter_sqids(chunk_size=2, with_objects=True))
+    assert pairs == [(instance.sqid, instance) for instance in instances]
+
+
+def test_aiter_sqids():
+    from asgiref.sync import async_to_sync
+
+    from tests.test_app.models import TestModel
+
+    instances = [TestModel.objects.create() for _ in range(5)]
+    qs = TestModel.objects.order_by("id")
+
+    async def collect(**kwargs):
+        return [item async for item in qs.aiter_sqids(chunk_size=2, **kwargs)]
+
+    assert async_to_sync(collect)() == [instance.sqid for instance in instances]
+    assert async_to_sync(collect)(with_objects=True) == [
+        (instance.sqid, instance) for instance in instances
+    ]
+
+
+def test_sqid_encode_expression():
+    from django.db.models import Min
+
+    from django_sqids.expressions import SqidEncode
+    from tests.test_app.models import (
+        TestModelWithPrefix,
+        TestUser,
+        TestUserRelated,
+    )
+
+    instances = [TestModelWithPrefix.objects.create() for _ in range(5)]
+    qs = TestModelWithPrefix.objects.annotate(
+        encoded=SqidEncode("id", field=TestModelWithPrefix.sqid)
+    )
+    assert {obj.encoded for obj in qs} == {instance.sqid for instance in instances}
+    assert list(qs.order_by("encoded").values_list("encoded", flat=True)) == sorted(
+        instance.sqid for instance in instances
+    )
+    assert list(qs.filter(encoded=instances[0].sqid).values_list("id", flat=True)) == [
+        instances[0].id
+    ]
+
+    user = TestUser.objects.create(username="a")
+    related = [TestUserRelated.objects.create(user=user) for _ in range(2)]
+    users = TestUser.objects.annotate(
+        first_related=SqidEncode(
+            Min("related__id"), field="test_app.TestUserRelated.sqid"
+        )
+    )
+    assert users.get().first_related == related[0].sqid
+
+
+def test_sqid_encode_expression_does_not_connect():
+    from unittest import mock
+
+    from django.db import connection
+
+    from django_sqids.expressions import SqidEncode
+    from tests.test_app.models import TestModelWithPrefix
+
+    qs = TestModelWithPrefix.objects.values_list(
+        SqidEncode("id", field=TestModelWithPrefix.sqid), flat=True
+    )
+    with mock.patch.object(connection, "ensure_connection", side_effect=AssertionError):
+        assert "DJANGO_SQIDS_ENCODE" in str(qs.query)
+
+
+def test_sqid_encode_function_on_new_connections():
+    from django.db import connection
+
+    from django_sqids.expressions import ENCODE_FUNCTION
+    from tests.test_app.models import TestModelWithPrefix
+
+    new_connection = connection.copy()
+    try:
+        with new_connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT %s(1, 'test_app.TestModelWithPrefix.sqid')" % ENCODE_FUNCTION
+            )
+            assert cursor.fetchone() == (TestModelWithPrefix.sqid.encode(1),)
+    finally:
+        new_connection.close()
+
+
+def test_sqid_encode_expression_falls_back_to_python():
+    from unittest import mock
+
+    from django.db import connection
+
+    from django_sqids.expressions import SqidEncode
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    qs = TestModelWithPrefix.objects.values_list(
+        SqidEncode("id", field=TestModelWithPrefix.sqid), flat=True
+    )
+    with mock.patch.object(connection, "vendor", "postgresql"):
+        sql = str(qs.query)
+        assert list(qs) == [instance.sqid]
+        ordered = TestModelWithPrefix.objects.annotate(
+            encoded=SqidEncode("id", field=TestModelWithPrefix.sqid)
+        ).order_by("encoded")
+        assert [obj.encoded for obj in ordered] == [instance.sqid]
+    assert "DJANGO_SQIDS_ENCODE" not in sql
+
+
+def test_sqid_encode_expression_fallback_limits():
+    from unittest import mock
+
+    from django.db import NotSupportedError, connection
+    from django.db.models import OuterRef, Subquery, Value
+    from django.db.models.functions import Coalesce, Concat
+
+    from django_sqids.expressions import SqidEncode
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    encoded = SqidEncode("id", field=TestModelWithPrefix.sqid)
+    querysets = [
+        TestModelWithPrefix.objects.annotate(encoded=encoded).filter(
+            encoded=instance.sqid
+        ),
+        TestModelWithPrefix.objects.annotate(
+            encoded=Coalesce(encoded, Value(""))
+        ).values_list("encoded", flat=True),
+        TestModelWithPrefix.objects.annotate(
+            encoded=Concat(encoded, Value("!"))
+        ).values_list("encoded", flat=True),
+        TestModelWithPrefix.objects.annotate(
+            encoded=Subquery(
+                TestModelWithPrefix.objects.filter(pk=OuterRef("pk")).values_list(
+                    SqidEncode("id", field=TestModelWithPrefix.sqid)
+                )
+            )
+        ).values_list("encoded", flat=True),
+    ]
+    for vendor in ("postgresql", "mysql", "oracle"):
+        with mock.patch.object(connection, "vendor", vendor):
+            for qs in querysets:
+                with pytest.raises(NotSupportedError):
+                    list(qs)
+    # SQLite computes the sqids in the database
+    assert list(querysets[0]) == [instance]
+    assert list(querysets[1]) == list(querysets[3]) == [instance.sqid]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sqids_export_command_csv(tmp_path, workers):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from tests.test_app.models import TestModelWithPrefix
+
+    instances = [TestModelWithPrefix.objects.create() for _ in range(7)]
+    output = tmp_path / "export.csv"
+    stderr = StringIO()
+    call_command(
+        "sqids_export",
+        "test_app.TestModelWithPrefix",
+        "--workers",
+        str(workers),
+        "--chunk-size",
+        "2",
+        "--output",
+        str(output),
+        stderr=stderr,
+    )
+    lines = output.read_text().splitlines()
+    assert lines == ["id,sqid"] + [f"{i.id},{i.sqid}" for i in instances]
+    assert "Exported 7 rows" in stderr.getvalue()
+
+
+def test_sqids_export_command_jsonl():
+    import json
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from tests.test_app.models import TestModelWithDifferentConfig
+
+    instances = [TestModelWithDifferentConfig.objects.create() for _ in range(3)]
+    stdout = StringIO()
+    call_command(
+        "sqids_export",
+        "test_app.TestModelWithDifferentConfig",
+        "--field",
+        "sqid",
+        "--format",
+        "jsonl",
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+    rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert rows == [{"id": i.id, "sqid": i.sqid} for i in instances]
+
+
+def test_sqids_export_command_unknown_model():
+    from django.core.management import CommandError, call_command
+
+    with pytest.raises(CommandError):
+        call_command("sqids_export", "test_app.DoesNotExist")
+    with pytest.raises(CommandError):
+        call_command("sqids_export", "test_app.TestModel", "--field", "other")
+
+
+def test_stored_sqid_is_saved(django_assert_num_queries):
+    from tests.test_app.models import TestModelWithStoredSqid
+
+    # the insert is followed by an update with the sqid of the new pk
+    with django_assert_num_queries(2):
+        instance = TestModelWithStoredSqid.objects.create()
+    assert instance.sqid_stored == instance.sqid
+    assert instance.sqid.startswith("S-")
+    instance.refresh_from_db()
+    assert instance.sqid_stored == instance.sqid
+    # already in sync, no extra query
+    with django_assert_num_queries(1):
+        instance.save()
+
+    other = TestModelWithStoredSqid(id=instance.id + 100)
+    with django_assert_num_queries(1):
+        other.save(force_insert=True)
+    assert TestModelWithStoredSqid.objects.get(sqid_stored=other.sqid) == other
+
+
+def test_stored_sqid_column_is_indexed():
+    from django.db import connection
+
+    from tests.test_app.models import TestModelWithStoredSqid
+
+    field = TestModelWithStoredSqid._meta.get_field("sqid_stored")
+    assert field.column == "sqid"
+    assert field.deconstruct()[1] == "django.db.models.CharField"
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, TestModelWithStoredSqid._meta.db_table
+        )
+    assert any(c["index"] and c["columns"] == ["sqid"] for c in constraints.values())
+
+
+def test_stored_sqid_bulk_create():
+    from tests.test_app.models import TestModelWithStoredSqid
+
+    instances = TestModelWithStoredSqid.objects.bulk_create(
+        [TestModelWithStoredSqid() for _ in range(3)]
+    )
+    stored = dict(TestModelWithStoredSqid.objects.values_list("id", "sqid_stored"))
+    assert stored == {i.id: i.sqid for i in instances}
+
+
+def test_stored_sqid_lookups():
+    from tests.test_app.models import TestModelWithStoredSqid
+
+    instance = TestModelWithStoredSqid.objects.create()
+    qs = TestModelWithStoredSqid.objects.filter(sqid__startswith=instance.sqid[:3])
+    assert instance in qs
+    assert '"sqid" LIKE' in str(qs.query).split("WHERE")[1]
+    assert list(
+        TestModelWithStoredSqid.objects.filter(
+            sqid__icontains=instance.sqid[2:].lower()
+        )
+    ) == [instance]
+    # exact lookups still use the primary key
+    qs = TestModelWithStoredSqid.objects.filter(sqid=instance.sqid)
+    assert '"sqid"' not in str(qs.query).split("WHERE")[1]
+    assert list(qs) == [instance]
+
+
+def test_sqids_backfill_command():
+    from io import StringIO
+
+    from django.core.management import CommandError, call_command
+
+    from tests.test_app.models import TestModelWithStoredSqid
+
+    instances = [TestModelWithStoredSqid.objects.create() for _ in range(5)]
+    TestModelWithStoredSqid.objects.filter(id__gt=instances[1].id).update(
+        sqid_stored=None
+    )
+    stderr = StringIO()
+    call_command(
+        "sqids_backfill",
+        "test_app.TestModelWithStoredSqid",
+        "--chunk-size",
+        "2",
+        stderr=stderr,
+    )
+    assert "Updated 3 of 5 rows" in stderr.getvalue()
+    stored = dict(TestModelWithStoredSqid.objects.values_list("id", "sqid_stored"))
+    assert stored == {i.id: i.sqid for i in instances}
+
+    with pytest.raises(CommandError):
+        call_command("sqids_backfill", "test_app.TestModel")
+
+
+def test_drf_sqids_related_field(django_assert_num_queries):
+    from django_sqids.rest_framework import SqidsPrimaryKeyRelatedField
+    from tests.test_app.models import TestUser, TestUserRelated
+
+    class TestUserRelatedSerializer(serializers.ModelSerializer):
+        user = SqidsPrimaryKeyRelatedField(queryset=TestUser.objects.all())
+
+        class Meta:
+            model = TestUserRelated
+            fields = ["sqid", "user"]
+
+    user = TestUser.objects.create(username="drf")
+    related = TestUserRelated.objects.get(
+        pk=TestUserRelated.objects.create(user=user).pk
+    )
+    # encoded from user_id, the user is not loaded
+    with django_assert_num_queries(0):
+        data = TestUserRelatedSerializer(related).data
+    assert data == {"sqid": related.sqid, "user": user.sqid}
+
+    serializer = TestUserRelatedSerializer(data={"user": user.sqid})
+    assert serializer.is_valid(), serializer.errors
+    assert serializer.validated_data["user"] == user
+
+    for invalid in ("invalid", TestUser.sqid.encode(user.id + 100), user.id):
+        serializer = TestUserRelatedSerializer(data={"user": invalid})
+        assert not serializer.is_valid()
+        assert "user" in serializer.errors
+
+
+def test_sqids_backfill_command_composite():
+    from django.core.management import call_command
+
+    from tests.test_app.models import TestTenantModelWithStoredSqid
+
+    instances = [
+        TestTenantModelWithStoredSqid.objects.create(tenant_id=i) for i in range(3)
+    ]
+    TestTenantModelWithStoredSqid.objects.update(sqid_stored=None)
+    call_command("sqids_backfill", "test_app.TestTenantModelWithStoredSqid")
+    stored = dict(
+        TestTenantModelWithStoredSqid.objects.values_list("id", "sqid_stored")
+    )
+    assert stored == {i.id: i.sqid for i in instances}
+
+
+def test_real_col_of_composite_field():
+    from tests.test_app.models import TestTenantModel
+
+    with pytest.raises(ConfigError):
+        TestTenantModel.sqid.real_col
+    assert [col.name for col in TestTenantModel.sqid.real_cols] == ["tenant_id", "id"]
+
+
+def test_drf_sqids_related_field_composite(django_assert_num_queries):
+    from django_sqids.rest_framework import SqidsPrimaryKeyRelatedField
+    from tests.test_app.models import TestTenantModel
+
+    class TenantsSerializer(serializers.Serializer):
+        tenant = SqidsPrimaryKeyRelatedField(queryset=TestTenantModel.objects.all())
+        tenants = SqidsPrimaryKeyRelatedField(
+            queryset=TestTenantModel.objects.all(), many=True
+        )
+
+    objs = [TestTenantModel.objects.create(tenant_id=i) for i in (1, 2, 2)]
+    sqids = [obj.sqid for obj in objs]
+
+    with django_assert_num_queries(1):
+        data = TenantsSerializer(
+            {"tenant": objs[0], "tenants": TestTenantModel.objects.order_by("id")}
+        ).data
+    assert data == {"tenant": sqids[0], "tenants": sqids}
+
+    serializer = TenantsSerializer(data={"tenant": sqids[1], "tenants": sqids[::-1]})
+    with django_assert_num_queries(2):
+        assert serializer.is_valid(), serializer.errors
+    assert serializer.validated_data == {"tenant": objs[1], "tenants": objs[::-1]}
+
+    missing = TestTenantModel.sqid.encode((1, objs[-1].id + 100))
+    serializer = TenantsSerializer(data={"tenant": missing, "tenants": [missing]})
+    assert not serializer.is_valid()
+    assert set(serializer.errors) == {"tenant", "tenants"}
+
+
+def test_drf_sqids_related_field_many(django_assert_num_queries):
+    from django_sqids.rest_framework import SqidsPrimaryKeyRelatedField
+    from tests.test_app.models import TestTeam, TestUser
+
+    class TestTeamSerializer(serializers.ModelSerializer):
+        members = SqidsPrimaryKeyRelatedField(
+            queryset=TestUser.objects.all(), many=True
+        )
+
+        class Meta:
+            model = TestTeam
+            fields = ["sqid", "members"]
+
+    users = [TestUser.objects.create(username=f"member{i}") for i in range(3)]
+    sqids = [user.sqid for user in users]
+    serializer = TestTeamSerializer(data={"members": sqids})
+    with django_assert_num_queries(1):
+        assert serializer.is_valid(), serializer.errors
+    assert serializer.validated_data["members"] == users
+
+    team = serializer.save()
+    team = TestTeam.objects.get(pk=team.pk)
+    # only the ids of the members are fetched
+    with django_assert_num_queries(1):
+        data = TestTeamSerializer(team).data
+    assert sorted(data["members"]) == sorted(sqids)
+    team = TestTeam.objects.prefetch_related("members").get(pk=team.pk)
+    with django_assert_num_queries(0):
+        assert sorted(TestTeamSerializer(team).data["members"]) == sorted(sqids)
+
+    serializer = TestTeamSerializer(data={"members": sqids + ["invalid"]})
+    assert not serializer.is_valid()
+    assert "invalid" in str(serializer.errors["members"])
+
+
+def test_codec_from_related_field(django_assert_num_queries):
+    from tests.test_app.models import TestUserRelatedWithPrefix, TestUserWithPrefix
+
+    user = TestUserWithPrefix.objects.create(username="codec_from")
+    related = TestUserRelatedWithPrefix.objects.create(user=user)
+    related = TestUserRelatedWithPrefix.objects.get(pk=related.pk)
+    # encoded from user_id with the config of TestUserWithPrefix.sqid
+    with django_assert_num_queries(0):
+        assert related.user_sqid == user.sqid
+    assert related.user_sqid.startswith("U-")
+    assert related.sqid.startswith("R-")
+
+    qs = TestUserRelatedWithPrefix.objects.filter(user_sqid=user.sqid)
+    assert "JOIN" not in str(qs.query)
+    assert list(qs) == [related]
+    assert list(
+        TestUserRelatedWithPrefix.objects.filter(user_sqid__in=[user.sqid, "invalid"])
+    ) == [related]
+    assert not TestUserRelatedWithPrefix.objects.filter(user_sqid=related.sqid).exists()
+    assert list(
+        TestUserRelatedWithPrefix.objects.values_list("user_sqid", flat=True)
+    ) == [user.sqid]
+
+
+def test_codec_from_config_error():
+    with pytest.raises(ConfigError):
+        SqidsField(real_field_name="user_id", codec_from="user", prefix="U-")
+    with pytest.raises(ConfigError):
+        SqidsField(real_field_name="user_id", codec_from="user", min_length=5)
+
+
+def test_sqids_converter(client):
+    from django.urls import NoReverseMatch, Resolver404, resolve
+
+    from tests.test_app.models import TestModel, TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    url = reverse("converter", kwargs={"pk": instance.pk})
+    assert url == f"/converter/{instance.sqid}/"
+    assert resolve(url).kwargs == {"pk": instance.pk}
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.context["object"] == instance
+
+    other = TestModel.objects.create()
+    for invalid in ("P-", "P-" + "a" * 100, other.sqid, "P-" + other.sqid + "/x"):
+        with pytest.raises(Resolver404):
+            resolve(f"/converter/{invalid}/")
+    with pytest.raises(NoReverseMatch):
+        reverse("converter", kwargs={"pk": instance.sqid})
+
+
+def test_sqids_converter_with_own_instance(client):
+    from tests.test_app.models import TestModelWithOwnInstance
+
+    instance = TestModelWithOwnInstance.objects.create()
+    url = reverse("own-instance-detail", kwargs={"pk": instance.pk})
+    assert url == f"/own-instance/{instance.sqid}/detail/"
+    # the converter stops at the slash of the included patterns
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.context["object"] == instance
+
+
+def test_in_bulk_by_sqid(django_assert_num_queries, sqids_metrics):
+    from django.db import connection
+
+    from tests.test_app.models import TestModelWithPrefix
+
+    instances = [TestModelWithPrefix.objects.create() for _ in range(3)]
+    sqids = [instance.sqid for instance in instances]
+    missing = TestModelWithPrefix.sqid.encode(instances[-1].pk + 100)
+    sqids_metrics.reset()
+
+    with django_assert_num_queries(1):
+        result = TestModelWithPrefix.objects.in_bulk_by_sqid(
+            sqids + [sqids[0], missing, "invalid", instances[0].pk]
+        )
+    assert result == dict(zip(sqids, instances))
+    # the objects are not encoded again
+    counts = sqids_metrics.snapshot()["test_app.TestModelWithPrefix.sqid"]
+    assert counts["decode_calls"] == 7
+    assert counts["encode_calls"] == 0
+
+    with django_assert_num_queries(0):
+        assert TestModelWithPrefix.objects.in_bulk_by_sqid(["invalid"]) == {}
+
+    # batched for databases with a limit of query parameters
+    max_query_params = connection.features.max_query_params
+    connection.features.max_query_params = 2
+    try:
+        with django_assert_num_queries(2):
+            assert TestModelWithPrefix.objects.in_bulk_by_sqid(sqids) == dict(
+                zip(sqids, instances)
+            )
+    finally:
+        connection.features.max_query_params = max_query_params
+
+
+def test_composite_sqids(django_assert_num_queries):
+    from tests.test_app.models import TestTenantModel
+
+    instance = TestTenantModel.objects.create(tenant_id=7)
+    assert instance.sqid == "C-" + Sqids().encode([7, instance.id])
+    assert TestTenantModel.sqid.decode(instance.sqid) == (7, instance.id)
+    assert TestTenantModel.sqid.decode("C-" + Sqids().encode([instance.id])) is None
+    assert TestTenantModel.sqid.encode_many([(7, instance.id), None]) == [
+        instance.sqid,
+        None,
+    ]
+
+    qs = TestTenantModel.objects.filter(sqid=instance.sqid)
+    where = str(qs.query).split("WHERE")[1]
+    assert '"tenant_id" = 7' in where and f'"id" = {instance.id}' in where
+    assert list(qs) == [instance]
+    with django_assert_num_queries(0):
+        assert list(TestTenantModel.objects.filter(sqid="C-invalid")) == []
+    assert list(TestTenantModel.objects.exclude(sqid=instance.sqid)) == []
+    assert list(TestTenantModel.objects.filter(sqid__isnull=False)) == [instance]
+    assert TestTenantModel.objects.get_by_sqid(instance.sqid) == instance
+
+
+def test_composite_sqids_in_lookup_groups_by_tenant():
+    from tests.test_app.models import TestTenantModel
+
+    instances = [TestTenantModel.objects.create(tenant_id=i % 2) for i in range(4)]
+    sqids = [instance.sqid for instance in instances]
+    qs = TestTenantModel.objects.filter(sqid__in=sqids + ["invalid"])
+    where = str(qs.query).split("WHERE")[1]
+    assert where.count('"tenant_id" =') == 2
+    assert where.count(" IN ") == 2
+    assert sorted(qs, key=lambda i: i.id) == instances
+
+    assert TestTenantModel.objects.in_bulk_by_sqid(sqids[:3] + ["invalid"]) == dict(
+        zip(sqids[:3], instances[:3])
+    )
+    assert list(TestTenantModel.objects.iter_sqids()) == sqids
+
+
+@pytest.mark.django_db(databases=["default", "shard1"])
+def test_shard_router():
+    from django.db import connections
+
+    from django_sqids.routers import split_by_db
+    from tests.test_app.models import TestShardedModel
+
+    if "shard1" not in connections:
+        pytest.skip("requires the shard1 database")
+
+    first, second = TestShardedModel(shard=0), TestShardedModel(shard=1)
+    first.save()
+    second.save()
+    assert (first._state.db, second._state.db) == ("default", "shard1")
+    assert TestShardedModel.objects.using("shard1").get() == second
+
+    assert TestShardedModel.objects.get_by_sqid(second.sqid) == second
+    assert TestShardedModel.objects.for_sqid(first.sqid).db == "default"
+    assert TestShardedModel.objects.for_sqid(second.sqid).db == "shard1"
+    # invalid sqids are left to the other routers
+    assert TestShardedModel.objects.for_sqid("invalid").db == "default"
+
+    assert split_by_db(TestShardedModel, [first.sqid, second.sqid]) == {
+        "default": [first.sqid],
+        "shard1": [second.sqid],
+    }
+    result = TestShardedModel.objects.in_bulk_by_sqid([first.sqid, second.sqid])
+    assert result == {first.sqid: first, second.sqid: second}
+    assert result[second.sqid]._state.db == "shard1"
+    assert TestShardedModel.objects.using("default").in_bulk_by_sqid(
+        [first.sqid, second.sqid]
+    ) == {first.sqid: first}
+
+    # create() and bulk_create() route by the objects
+    created = TestShardedModel.objects.create(shard=1)
+    assert created._state.db == "shard1"
+    assert TestShardedModel.objects.get_by_sqid(created.sqid) == created
+    objs = TestShardedModel.objects.bulk_create(
+        [TestShardedModel(shard=shard) for shard in (0, 1, 2)]
+    )
+    assert [obj._state.db for obj in objs] == ["default", "shard1", "default"]
+    assert TestShardedModel.objects.using("shard1").count() == 3
+    assert TestShardedModel.objects.using("default").count() == 3
+
+
+def test_shard_router_needs_composite_field():
+    from django_sqids.routers import SqidsShardRouter
+    from tests.test_app.models import TestModelWithPrefix
+
+    shards = {"test_app.TestModelWithPrefix": ["default", "shard1"]}
+    with override_settings(DJANGO_SQIDS_SHARDS=shards):
+        with pytest.raises(ConfigError):
+            SqidsShardRouter().db_for_write(
+                TestModelWithPrefix, instance=TestModelWithPrefix()
+            )
+        with pytest.raises(ConfigError):
+            SqidsShardRouter().db_for_read(TestModelWithPrefix, sqid="P-Uk")
+
+
+def test_admin_sqids_search_mixin(admin_client, django_assert_num_queries):
+    from django.contrib import admin
+
+    from tests.test_app.models import TestUserWithPrefix
+
+    users = [TestUserWithPrefix.objects.create(username=f"user{i}") for i in range(3)]
+    model_admin = admin.site._registry[TestUserWithPrefix]
+    queryset = TestUserWithPrefix.objects.all()
+
+    qs, may_have_duplicates = model_admin.get_search_results(
+        None, queryset, users[0].sqid
+    )
+    assert not may_have_duplicates
+    where = str(qs.query).split("WHERE")[1]
+    assert "LIKE" not in where
+    with django_assert_num_queries(1):
+        assert list(qs) == [users[0]]
+
+    qs, _ = model_admin.get_search_results(
+        None, queryset, f" {users[0].sqid}, {users[2].sqid}\n{users[0].sqid}"
+    )
+    assert str(qs.query).count("SELECT") == 1
+    assert sorted(qs, key=lambda u: u.id) == [users[0], users[2]]
+
+    # other terms use the search_fields
+    qs, _ = model_admin.get_search_results(None, queryset, "user1")
+    assert list(qs) == [users[1]]
+    qs, _ = model_admin.get_search_results(None, queryset, f"{users[0].sqid} user1")
+    assert list(qs) == []
+
+    response = admin_client.get(
+        f"/admin/test_app/testuserwithprefix/?q={users[1].sqid}"
+    )
+    assert f">{users[1].sqid}</a></th>" in response.content.decode()
+
+
+def test_admin_sqids_search_mixin_without_prefix():
+    from django.contrib import admin
+
+    from tests.test_app.models import TestUser
+
+    user = TestUser.objects.create(username="jsmith", last_name="smith")
+    model_admin = admin.site._registry[TestUser]
+    queryset = TestUser.objects.all()
+
+    # words that happen to decode are still searched as text
+    assert TestUser.sqid.decode("smith") is not None
+    qs, _ = model_admin.get_search_results(None, queryset, "smith")
+    assert list(qs) == [user]
+
+    qs, _ = model_admin.get_search_results(None, queryset, user.sqid)
+    assert "LIKE" not in str(qs.query).split("WHERE")[1]
+    assert list(qs) == [user]
+
+
+def test_sqids_json_serializer(django_assert_num_queries, sqids_metrics):
+    import json
+
+    from django.core import serializers
+
+    from tests.test_app.models import TestUserRelatedWithPrefix, TestUserWithPrefix
+
+    user = TestUserWithPrefix.objects.create(username="serialized")
+    related = [TestUserRelatedWithPrefix.objects.create(user=user) for _ in range(3)]
+    sqids_metrics.reset()
+
+    with django_assert_num_queries(1):
+        data = json.loads(
+            serializers.serialize(
+                "sqids_json", TestUserRelatedWithPrefix.objects.order_by("id")
+            )
+        )
+    # each field encodes the distinct values once
+    counts = sqids_metrics.snapshot()
+    assert counts["test_app.TestUserRelatedWithPrefix.sqid"]["encode_calls"] == 3
+    assert counts["test_app.TestUserRelatedWithPrefix.user_sqid"]["encode_calls"] == 1
+    assert [d["pk"] for d in data] == [r.pk for r in related]
+    assert [d["fields"]["sqid"] for d in data] == [r.sqid for r in related]
+    assert {d["fields"]["user_sqid"] for d in data} == {user.sqid}
+    assert data[0]["fields"]["user"] == user.pk
+
+    data = json.loads(
+        serializers.serialize(
+            "sqids_json",
+            TestUserRelatedWithPrefix.objects.order_by("id"),
+            sqid_keys=True,
+        )
+    )
+    assert [d["pk"] for d in data] == [r.sqid for r in related]
+    assert {d["fields"]["user"] for d in data} == {user.sqid}
+
+
+def test_sqids_json_loaddata(tmp_path, django_assert_max_num_queries):
+    from django.core import serializers
+    from django.core.management import call_command
+
+    from tests.test_app.models import TestTeam, TestUser
+
+    users = [TestUser.objects.create(username=f"fixture{i}") for i in range(3)]
+    team = TestTeam.objects.create()
+    team.members.set(users[:2])
+    fixture = tmp_path / "teams.sqids_json"
+    fixture.write_text(
+        serializers.serialize("sqids_json", [*users, team], sqid_keys=True)
+    )
+    assert team.sqid in fixture.read_text()
+    assert str(users[0].sqid) in fixture.read_text()
+
+    TestTeam.objects.all().delete()
+    TestUser.objects.filter(id__in=[u.id for u in users]).delete()
+    call_command("loaddata", str(fixture), verbosity=0)
+
+    team = TestTeam.objects.get()
+    assert sorted(team.members.values_list("id", flat=True)) == [
+        u.id for u in users[:2]
+    ]
+    assert TestUser.objects.filter(username="fixture2").get().id == users[2].id
+
+    with pytest.raises(serializers.base.DeserializationError):
+        list(
+            serializers.deserialize(
+                "sqids_json",
+                '[{"model": "test_app.testteam", "pk": "T-!", "fields": {}}]',
+            )
+        )
+
+
+def test_sqids_json_to_field_reference():
+    from django.core import serializers
+
+    from tests.test_app.models import TestUser, TestUserRelatedByUsername
+
+    user = TestUser.objects.create(username="alice")
+    related = TestUserRelatedByUsername.objects.create(user=user)
+
+    for sqid_keys in (False, True):
+        data = serializers.serialize("sqids_json", [related], sqid_keys=sqid_keys)
+        assert '"user": "alice"' in data
+        # the username is not decoded as a sqid of the user
+        (obj,) = serializers.deserialize("sqids_json", data)
+        assert obj.object.user_id == "alice"
+        obj.save()
+        assert TestUserRelatedByUsername.objects.get(pk=related.pk).user == user
+
+
+def test_get_sqids_field_skips_codec_from_fields():
+    from django.core.exceptions import FieldDoesNotExist
+    from django.db import models
+
+    from django_sqids import get_sqids_field
+    from tests.test_app.models import TestUserWithPrefix
+
+    class CodecFromFirstModel(models.Model):
+        class Meta:
+            app_label = "tests.test_app"
+
+        user_sqid = SqidsField(real_field_name="user_id", codec_from="user")
+        sqid = SqidsField(prefix="F-")
+        user = models.ForeignKey(
+            TestUserWithPrefix, related_name="+", on_delete=models.CASCADE
+        )
+
+    class CodecFromOnlyModel(models.Model):
+        class Meta:
+            app_label = "tests.test_app"
+
+        first_sqid = SqidsField(real_field_name="first_id", codec_from="first")
+        first = models.ForeignKey(
+            CodecFromFirstModel, related_name="+", on_delete=models.CASCADE
+        )
+
+    assert get_sqids_field(CodecFromFirstModel) is CodecFromFirstModel.sqid
+    assert get_sqids_field(CodecFromFirstModel, "user_sqid").name == "user_sqid"
+    # the key of the related model, not its foreign key
+    assert CodecFromOnlyModel.first_sqid.codec_source is CodecFromFirstModel.sqid
+    assert CodecFromOnlyModel.first_sqid.prefix == "F-"
+    with pytest.raises(FieldDoesNotExist):
+        get_sqids_field(CodecFromOnlyModel)
+    assert get_sqids_field(CodecFromOnlyModel, "first_sqid").name == "first_sqid"
+
+
+def test_legacy_versions(sqids_metrics):
+    from django_sqids.codec import SqidsCodec
+    from tests.test_app.models import TestModelWithVersions
+
+    field = TestModelWithVersions.sqid
+    instance = TestModelWithVersions.objects.create()
+    v1_sqid = "v1-" + SqidsCodec(alphabet=shuffle_alphabet(1)).encode(instance.id)
+    v0_sqid = SqidsCodec().encode(instance.id)
+
+    # the current version encodes
+    assert instance.sqid == "v2-" + SqidsCodec(alphabet=shuffle_alphabet(2)).encode(
+        instance.id
+    )
+    for sqid in (instance.sqid, v1_sqid, v0_sqid):
+        assert field.decode(sqid) == instance.id
+        assert field.is_valid_sqid(sqid)
+        assert TestModelWithVersions.objects.get(sqid=sqid) == instance
+    assert field.decode("v3-" + v0_sqid) is None
+    assert field.decode("v1-!") is None
+
+    assert field.legacy_hits() == {"v1-": 2, "": 2}
+    counts = sqids_metrics.snapshot()["test_app.TestModelWithVersions.sqid"]
+    assert counts["decode_legacy_hits"] == 4
+
+
+def test_legacy_versions_ambiguous_prefixes():
+    import string
+
+    from django.db.models import Model
+
+    from django_sqids import SqidsVersion
+
+    ambiguous = [
+        # "ars" would be a sqid of the current version and of the "a" version
+        {
+            "legacy_versions": [
+                SqidsVersion("a", alphabet=string.digits + string.ascii_lowercase)
+            ]
+        },
+        {"prefix": "v2", "legacy_versions": [SqidsVersion("")]},
+        {
+            "prefix": "v2",
+            "sqids_instance": Sqids(),
+            "legacy_versions": [SqidsVersion("v2-")],
+        },
+    ]
+    for kwargs in ambiguous:
+        # detected when the model is defined, not when a sqid is decoded
+        with pytest.raises(ConfigError):
+
+            class AmbiguousVersionsModel(Model):
+                class Meta:
+                    app_label = "tests.test_app"
+
+                sqid = SqidsField(**kwargs)
+
+    class SeparatedVersionsModel(Model):
+        class Meta:
+            app_label = "tests.test_app"
+
+        sqid = SqidsField(prefix="v2-", legacy_versions=[SqidsVersion("")])
+
+    # no sqid of the default alphabet contains "-"
+    field = SeparatedVersionsModel.sqid
+    for number in range(2000):
+        assert field.decode(field.encode(number)) == number
+
+
+def test_legacy_versions_config_error():
+    from django_sqids import SqidsVersion
+
+    with pytest.raises(ConfigError):
+        SqidsField(prefix="a-", legacy_versions=[SqidsVersion("a-")])
+    with pytest.raises(ConfigError):
+        SqidsField(("a", "b"), legacy_versions=[SqidsVersion("a-")])
+
+
+@pytest.fixture
+def object_cache():
+    from django.core.cache import cache
+
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_get_cached_by_sqid(django_assert_num_queries, object_cache):
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    with django_assert_num_queries(1):
+        assert TestModelWithPrefix.objects.get_cached_by_sqid(instance.sqid) == instance
+    with django_assert_num_queries(0):
+        cached = TestModelWithPrefix.objects.get_cached_by_sqid(instance.sqid)
+    assert cached == instance and cached is not instance
+    assert object_cache.get(
+        "django_sqids:test_app.testmodelwithprefix.sqid:%d" % instance.pk
+    )
+
+    # invalid sqids don't query the database
+    with django_assert_num_queries(0):
+        with pytest.raises(TestModelWithPrefix.DoesNotExist):
+            TestModelWithPrefix.objects.get_cached_by_sqid("invalid")
+
+    # saving invalidates the cached object
+    instance.save()
+    with django_assert_num_queries(1):
+        TestModelWithPrefix.objects.get_cached_by_sqid(instance.sqid)
+
+    # filtered querysets are not cached
+    with django_assert_num_queries(1):
+        assert (
+            TestModelWithPrefix.objects.filter(pk__gt=0).get_cached_by_sqid(
+                instance.sqid
+            )
+            == instance
+        )
+
+    sqid = instance.sqid
+    instance.delete()
+    with django_assert_num_queries(1):
+        with pytest.raises(TestModelWithPrefix.DoesNotExist):
+            TestModelWithPrefix.objects.get_cached_by_sqid(sqid)
+
+
+def test_get_cached_by_sqid_in_transaction(
+    django_capture_on_commit_callbacks, object_cache
+):
+    from django.db import transaction
+
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    key = "django_sqids:test_app.testmodelwithprefix.sqid:%d" % instance.pk
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with transaction.atomic():
+            instance.save()
+            assert object_cache.get(key) is None
+            # another connection reads the old row before the commit
+            object_cache.set(key, TestModelWithPrefix(pk=instance.pk))
+    assert len(callbacks) == 1
+    assert object_cache.get(key) is None
+
+
+def test_get_cached_by_sqid_not_cacheable(django_assert_num_queries, object_cache):
+    from django.db.models import Value
+
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    querysets = [
+        TestModelWithPrefix.objects.annotate(answer=Value(42)),
+        TestModelWithPrefix.objects.extra(select={"answer": "42"}),
+        TestModelWithPrefix.objects.select_related(),
+        TestModelWithPrefix.objects.using("default"),
+        TestModelWithPrefix.objects.only("id"),
+    ]
+    for qs in querysets:
+        for _ in range(2):
+            with django_assert_num_queries(1):
+                assert qs.get_cached_by_sqid(instance.sqid) == instance
+        with django_assert_num_queries(1):
+            qs.get_many_cached_by_sqid([instance.sqid])
+    assert (
+        object_cache.get_many(
+            ["django_sqids:test_app.testmodelwithprefix.sqid:%d" % instance.pk]
+        )
+        == {}
+    )
+    assert (
+        TestModelWithPrefix.objects.annotate(answer=Value(42))
+        .get_cached_by_sqid(instance.sqid)
+        .answer
+        == 42
+    )
+    assert not hasattr(
+        TestModelWithPrefix.objects.get_cached_by_sqid(instance.sqid), "answer"
+    )
+
+
+def test_object_cache_receivers():
+    from django.db.models.deletion import Collector
+    from django.db.models.signals import post_delete, post_save
+
+    from tests.test_app.models import TestModelWithCache, TestModelWithPrefix
+
+    # models without a SqidsManager keep their fast deletes
+    collector = Collector(using="default")
+    assert collector.can_fast_delete(TestModelWithCache.objects.all())
+    assert not collector.can_fast_delete(TestModelWithPrefix.objects.all())
+    assert not post_save.has_listeners(TestModelWithCache)
+    assert post_save.has_listeners(TestModelWithPrefix)
+    assert post_delete.has_listeners(TestModelWithPrefix)
+
+
+def test_get_cached_by_sqid_subclass(django_assert_num_queries, object_cache):
+    from tests.test_app.models import FirstSubClass
+
+    instance = FirstSubClass.objects.create()
+    FirstSubClass.objects.get_cached_by_sqid(instance.sqid)
+    parent_key = "django_sqids:test_app.testmodel.sqid:%d" % instance.pk
+    object_cache.set(parent_key, instance.testmodel_ptr)
+    # saving the child also invalidates the cached parent
+    instance.save()
+    assert object_cache.get(parent_key) is None
+    with django_assert_num_queries(1):
+        FirstSubClass.objects.get_cached_by_sqid(instance.sqid)
+
+
+def test_aget_cached_by_sqid(django_assert_num_queries, object_cache):
+    from asgiref.sync import async_to_sync
+
+    from tests.test_app.models import TestModelWithPrefix
+
+    instance = TestModelWithPrefix.objects.create()
+    get_cached_by_sqid = async_to_sync(
+        TestModelWithPrefix.objects.all().aget_cached_by_sqid
+    )
+    with django_assert_num_queries(1):
+        assert get_cached_by_sqid(instance.sqid) == instance
+    with django_assert_num_queries(0):
+        assert get_cached_by_sqid(instance.sqid) == instance
+    with pytest.raises(TestModelWithPrefix.DoesNotExist):
+        get_cached_by_sqid("invalid")
+
+
+def test_get_many_cached_by_sqid(django_assert_num_queries, object_cache):
+    from tests.test_app.models import TestModelWithPrefix, TestTenantModel
+
+    instances = [TestModelWithPrefix.objects.create() for _ in range(3)]
+    sqids = [instance.sqid for instance in instances]
+    missing = TestModelWithPrefix.sqid.encode(instances[-1].pk + 100)
+
+    TestModelWithPrefix.objects.get_cached_by_sqid(sqids[0])
+    with django_assert_num_queries(1):
+        result = TestModelWithPrefix.objects.get_many_cached_by_sqid(
+            sqids + [missing, "invalid"]
+        )
+    assert result == dict(zip(sqids, instances))
+    with django_assert_num_queries(0):
+        assert TestModelWithPrefix.objects.get_many_cached_by_sqid(sqids) == result
+        assert TestModelWithPrefix.objects.get_many_cached_by_sqid(["invalid"]) == {}
+
+    instances[1].delete()
+    with django_assert_num_queries(1):
+        result = TestModelWithPrefix.objects.get_many_cached_by_sqid(sqids)
+    assert list(result) == [sqids[0], sqids[2]]
+
+    # composite sqids
+    tenant = TestTenantModel.objects.create(tenant_id=3)
+    with django_assert_num_queries(1):
+        TestTenantModel.objects.get_many_cached_by_sqid([tenant.sqid])
+    with django_assert_num_queries(0):
+        assert TestTenantModel.objects.get_cached_by_sqid(tenant.sqid) == tenant
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_codec_matches_reference_implementation_with_random_blocklist(seed):
+    from django_sqids.codec import SqidsCodec
+
+    rng = random.Random(seed)
+    alphabet = "abcdefgh12"
+    # short words with shared prefixes block many sqids
+    blocklist = [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(3, 6)))
+        for _ in range(40)
+    ]
+    for min_length in (0, 8):
+        reference = Sqids(alphabet=alphabet, min_length=min_length, blocklist=blocklist)
+        codec = SqidsCodec(
+            alphabet=alphabet, min_length=min_length, blocklist=blocklist
+        )
+        for number in range(500):
+            try:
+                sqid = reference.encode([number])
+            except ValueError:
+                with pytest.raises(ValueError):
+                    codec.encode(number)
+                continue
+            assert codec.encode(number) == sqid
+
+
+def test_field_blocklist():
+    from django.db.models import Model
+
+    from django_sqids.codec import SqidsCodec
+
+    blocked = Sqids(blocklist=[]).encode([123456])
+
+    class BlocklistModel(Model):
+        class Meta:
+            app_label = "tests.test_app"
+
+        default = SqidsField()
+        empty = SqidsField(blocklist=[])
+        custom = SqidsField(blocklist=[blocked])
+
+    assert BlocklistModel.empty.get_sqids_config()["blocklist"] == ()
+    assert isinstance(BlocklistModel.empty.codec, SqidsCodec)
+    assert BlocklistModel.empty.codec is not BlocklistModel.default.codec
+    assert BlocklistModel.empty.encode(123456) == blocked
+    sqid = BlocklistModel.custom.encode(123456)
+    assert sqid == Sqids(blocklist=[blocked]).encode([123456]) != blocked
+    assert BlocklistModel.custom.decode(sqid) == 123456
+
+    with pytest.raises(ConfigError):
+        SqidsField(sqids_instance=Sqids(), blocklist=[])
+    with pytest.raises(ConfigError):
+        SqidsField(codec_from="user", blocklist=[])
@@ -1,7 +1,17 @@
-from django.urls import path
+from django.urls import include, path
 from django.contrib import admin
 
-from .test_app.views import test_model_view, test_model_with_prefix_view
+from django_sqids.converters import register_sqids_converter
+
+from .test_app.views import (
+    test_model_view,
+    test_model_with_own_instance_pk_view,
+    test_model_with_prefix_pk_view,
+    test_model_with_prefix_view,
+)
+
+register_sqids_converter("test_app.TestModelWithPrefix.sqid", "prefixed_sqid")
+register_sqids_converter("test_app.TestModelWithOwnInstance.sqid", "own_sqid")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -11,4 +21,21 @@ urlpatterns = [
         test_model_with_prefix_view,
         name="with-prefix",
     ),
+    path(
+        "converter/<prefixed_sqid:pk>/",
+        test_model_with_prefix_pk_view,
+        name="converter",
+    ),
+    path(
+        "own-instance/<own_sqid:pk>/",
+        include(
+            [
+                path(
+                    "detail/",
+                    test_model_with_own_instance_pk_view,
+                    name="own-instance-detail",
+                )
+            ]
+        ),
+    ),
 ]